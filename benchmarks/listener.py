@@ -0,0 +1,166 @@
+"""Benchmark the swear listener and commands against the in-memory database.
+
+Events and commands go through the same functions as in the bot, so this measures everything
+besides the database itself and doesn't need a postgres server.
+Run from the repository root with ``python -m benchmarks.listener``.
+"""
+import argparse
+import asyncio
+import dataclasses
+import datetime
+import functools
+import random
+import time
+import types
+import typing
+
+import hikari
+
+from culturebot.components.swears import component
+from culturebot.components.swears.buffer import SwearBuffer
+from culturebot.components.swears.counters import MessageCounters
+from culturebot.components.swears.dictionary import SwearDictionaries
+from culturebot.components.swears.leaderboard import SwearLeaderboard
+from culturebot.components.swears.registry import SwearUserRegistry
+
+from . import memory
+from .swears import make_corpus
+
+
+@dataclasses.dataclass
+class BenchmarkMember:
+    id: hikari.Snowflake
+    guild_id: hikari.Snowflake
+    display_avatar_url: None = None
+
+    def __str__(self) -> str:
+        return f"user#{self.id}"
+
+
+class BenchmarkContext:
+    """Just enough of a slash context for the swear commands, responses are discarded."""
+
+    def __init__(self, member: BenchmarkMember) -> None:
+        self.member = self.author = member
+        self.guild_id = member.guild_id
+
+    async def respond(self, *args: typing.Any, **kwargs: typing.Any) -> None:
+        pass
+
+
+class BenchmarkCache:
+    def get_user(self, user_id: int) -> None:
+        return None
+
+
+def make_message(
+    message_id: hikari.Snowflake, member: BenchmarkMember, content: str, timestamp: datetime.datetime
+) -> typing.Any:
+    author = types.SimpleNamespace(id=member.id)
+    return types.SimpleNamespace(
+        id=message_id, guild_id=member.guild_id, author=author, content=content, timestamp=timestamp
+    )
+
+
+async def run(messages: int, guilds: int, users: int, workers: int, flush_size: int) -> None:
+    connection = memory.make_connection()
+    await connection.connect()
+
+    rng = random.Random(0)
+    corpus = make_corpus(component.SWEARS, messages)
+    members = [
+        BenchmarkMember(hikari.Snowflake(rng.randrange(1, users + 1)), hikari.Snowflake(rng.randrange(1, guilds + 1)))
+        for _ in corpus
+    ]
+    now = datetime.datetime.now(datetime.timezone.utc)
+    first_id = hikari.Snowflake.from_datetime(now)
+
+    dictionaries = SwearDictionaries(connection, component.SWEARS)
+    registry = SwearUserRegistry(connection)
+    leaderboard = SwearLeaderboard(connection)
+    buffer = SwearBuffer(connection, registry, leaderboard, max_size=flush_size)
+    counters = MessageCounters()
+    pipeline = component.MessagePipeline(
+        functools.partial(
+            component.process_event,
+            dictionaries=dictionaries,
+            registry=registry,
+            buffer=buffer,
+            counters=counters,
+        ),
+        workers=workers,
+        max_size=messages,
+        key=component.message_key,
+    )
+    pipeline.start()
+
+    # every tenth message is edited and every hundredth deleted again
+    events: typing.List[component.MessageTask] = []
+    for index, (content, member) in enumerate(zip(corpus, members)):
+        message_id = hikari.Snowflake(first_id + index)
+        message = make_message(message_id, member, content, now)
+        events.append((message_id, hikari.GuildMessageCreateEvent(message=message, shard=None)))
+        if index % 10 == 0:
+            edited = make_message(message_id, member, content[::-1], now)
+            events.append((message_id, hikari.GuildMessageUpdateEvent(old_message=None, message=edited, shard=None)))
+        if index % 100 == 0:
+            event = hikari.GuildMessageDeleteEvent(
+                app=None,
+                shard=None,
+                channel_id=hikari.Snowflake(1),
+                guild_id=member.guild_id,
+                message_id=message_id,
+                old_message=None,
+            )
+            events.append((message_id, event))
+
+    start = time.perf_counter()
+    for task in events:
+        await pipeline.put(task)
+
+    await pipeline.close()
+    await buffer.close()
+    elapsed = time.perf_counter() - start
+    print(f"{'listener':>20}: {elapsed * 1000:8.2f} ms total, {elapsed / len(events) * 1e6:6.2f} us/event")
+
+    dependencies = dict(connection=connection, leaderboard=leaderboard)
+    commands: typing.Dict[str, typing.Callable[[BenchmarkContext], typing.Awaitable[typing.Any]]] = {
+        "user": lambda context: component.user_swears.callback(context, **dependencies),
+        "rank": lambda context: component.rank_swears.callback(context, leaderboard=leaderboard),
+        "guild": lambda context: component.guild_swears.callback(context, **dependencies, cache=BenchmarkCache()),
+        "trend": lambda context: component.trend_swears.callback(context, connection=connection),
+    }
+
+    contexts = [BenchmarkContext(member) for member in members[:1000]]
+    for name, command in commands.items():
+        # the first round loads what the commands cache, the second one is answered from it
+        for state in ("cold", "warm"):
+            start = time.perf_counter()
+            for context in contexts:
+                await command(context)
+
+            elapsed = time.perf_counter() - start
+            label = f"{name} ({state})"
+            print(f"{label:>20}: {elapsed * 1000:8.2f} ms total, {elapsed / len(contexts) * 1e6:6.2f} us/command")
+
+    totals = connection.tables["swears.total"].rows
+    print(f"counted {sum(row['amount'] for row in totals.values())} swears of {len(totals)} users")
+
+    for query, metrics in connection.metrics.slowest():
+        print(f"{metrics.latency.count:>8} x {metrics.latency.average * 1e6:8.2f} us: {query[:80]}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--guilds", type=int, default=20)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--flush-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    asyncio.run(run(args.messages, args.guilds, args.users, args.workers, args.flush_size))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Memory handlers of the raw statements of the swears component.
+
+Each handler answers a single statement the same way postgres would for the data the benchmarks
+generate, they aren't used by the bot itself. Statements which change have to be updated here too,
+running a statement without a handler raises NotImplementedError.
+"""
+import collections
+import datetime
+import typing
+
+from culturebot import sql
+from culturebot.components.swears import backfill, buffer, component, dictionary, export, leaderboard
+
+Rows = typing.List[typing.Mapping[str, typing.Any]]
+
+
+async def create_partition(con: sql.MemoryConnection, month: datetime.datetime) -> str:
+    # memory tables aren't partitioned
+    return "SELECT 1"
+
+
+async def checkpoint(con: sql.MemoryConnection, channel_id: int, guild_id: int, message_id: int, done: bool) -> str:
+    return await con.upsert(
+        "swears.backfill", "channel_id", channel_id=channel_id, guild_id=guild_id, message_id=message_id, done=done
+    )
+
+
+async def custom_guilds(con: sql.MemoryConnection) -> Rows:
+    return [dict(guild_id=guild_id) for guild_id in {row["guild_id"] for row in con.table("swears.word").rows.values()}]
+
+
+async def export_swears(con: sql.MemoryConnection, guild_id: int) -> Rows:
+    rows = [row for row in con.table("swears.swear").rows.values() if row["guild_id"] == guild_id]
+    rows.sort(key=lambda row: (row["user_id"], row["swear"]))
+    return [{column: row[column] for column in export.COLUMNS} for row in rows]
+
+
+async def top(con: sql.MemoryConnection, guild_id: int, limit: int) -> Rows:
+    rows = [row for row in con.table("swears.total").rows.values() if row["guild_id"] == guild_id]
+    rows.sort(key=lambda row: row["amount"], reverse=True)
+    return [dict(user_id=row["user_id"], amount=row["amount"]) for row in rows[:limit]]
+
+
+async def rank(con: sql.MemoryConnection, guild_id: int, user_id: int) -> Rows:
+    table = con.table("swears.total")
+    if (own := table.rows.get((guild_id, user_id))) is None:
+        return []
+
+    amounts = [row["amount"] for row in table.rows.values() if row["guild_id"] == guild_id]
+    position = sum(amount > own["amount"] for amount in amounts) + 1
+    return [dict(amount=own["amount"], rank=position, users=sum(amount > 0 for amount in amounts))]
+
+
+def top_swears(con: sql.MemoryConnection, guild_id: int, user_ids: typing.Sequence[int], limit: int) -> Rows:
+    swears: typing.Dict[int, Rows] = {user_id: [] for user_id in user_ids}
+    for row in con.table("swears.swear").rows.values():
+        if row["guild_id"] == guild_id and row["user_id"] in swears:
+            swears[row["user_id"]].append(row)
+
+    rows: Rows = []
+    for user_swears in swears.values():
+        rows += sorted(user_swears, key=lambda row: row["amount"], reverse=True)[:limit]
+
+    return rows
+
+
+async def user_swears(con: sql.MemoryConnection, user_id: int, guild_id: int) -> Rows:
+    return top_swears(con, guild_id, [user_id], 10)
+
+
+async def guild_swears(con: sql.MemoryConnection, guild_id: int, user_ids: typing.Sequence[int]) -> Rows:
+    return top_swears(con, guild_id, user_ids, 5)
+
+
+async def trend(
+    con: sql.MemoryConnection,
+    guild_id: int,
+    granularity: str,
+    since: datetime.datetime,
+    user_id: typing.Optional[int] = None,
+) -> Rows:
+    amounts: typing.Counter[datetime.datetime] = collections.Counter()
+    for row in con.table("swears.bucket").rows.values():
+        if row["guild_id"] != guild_id or row["bucket"] < since or user_id not in (None, row["user_id"]):
+            continue
+
+        # date_trunc in UTC
+        period = row["bucket"].astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+        if granularity == "day":
+            period = period.replace(hour=0)
+
+        amounts[period] += row["amount"]
+
+    return [dict(period=period, amount=amount) for period, amount in sorted(amounts.items())]
+
+
+HANDLERS: typing.Mapping[str, sql.memory.Handler] = {
+    buffer.PARTITION_EXPRESSION: create_partition,
+    backfill.CHECKPOINT_EXPRESSION: checkpoint,
+    dictionary.CUSTOM_EXPRESSION: custom_guilds,
+    export.EXPORT_EXPRESSION: export_swears,
+    leaderboard.TOP_EXPRESSION: top,
+    leaderboard.RANK_EXPRESSION: rank,
+    component.USER_EXPRESSION: user_swears,
+    component.GUILD_EXPRESSION: guild_swears,
+    component.TREND_EXPRESSION: trend,
+    component.USER_TREND_EXPRESSION: trend,
+}
+
+
+def make_connection() -> sql.MemoryConnection:
+    """Make a memory connection which can run every statement of the swears component."""
+    connection = sql.MemoryConnection()
+    for query, callback in HANDLERS.items():
+        connection.handle(query, callback)
+
+    return connection
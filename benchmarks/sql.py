@@ -0,0 +1,85 @@
+"""Benchmark fetching rows into model record classes.
+
+Needs a running postgres server, run from the repository root with
+``python -m benchmarks.sql --dsn postgres://...`` or with the POSTGRES environment variable set.
+"""
+import argparse
+import asyncio
+import os
+import time
+import typing
+
+import asyncpg
+
+from culturebot import sql
+
+T = typing.TypeVar("T")
+
+ROWS_EXPRESSION = """
+SELECT n AS user_id, n % 100 AS guild_id, 'swear' || (n % 50) AS swear, n AS amount
+FROM generate_series(1, $1) AS n
+"""
+
+
+def legacy_make_record(cls: typing.Type[T]) -> typing.Type[T]:
+    """Original implementation creating a new record class on every call."""
+    cls = type(cls.__name__, (sql.connection.AttributeRecord, cls), {})  # type: ignore
+    cls.__new__ = object.__new__
+    cls.__init__ = object.__init__
+    return cls
+
+
+async def best_of(repeat: int, callback: typing.Callable[[], typing.Awaitable[typing.Any]]) -> float:
+    timings: typing.List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await callback()
+        timings.append(time.perf_counter() - start)
+
+    return min(timings)
+
+
+async def run(dsn: str, rows: int, repeat: int) -> None:
+    con = await asyncpg.connect(dsn)
+
+    async def fetch(make_record: typing.Callable[[typing.Type[T]], typing.Type[T]]) -> typing.Sequence[typing.Any]:
+        return await con.fetch(ROWS_EXPRESSION, rows, record_class=make_record(sql.models.Swear))
+
+    async def fetch_and_read(make_record: typing.Callable[[typing.Type[T]], typing.Type[T]]) -> int:
+        return sum(swear.amount + swear.user_id for swear in await fetch(make_record))
+
+    async def fetch_small(make_record: typing.Callable[[typing.Type[T]], typing.Type[T]]) -> None:
+        for _ in range(100):
+            await con.fetchrow(ROWS_EXPRESSION, 1, record_class=make_record(sql.models.Swear))
+
+    try:
+        results = {
+            "fetch (legacy)": lambda: fetch(legacy_make_record),
+            "fetch (registry)": lambda: fetch(sql.connection.make_record),
+            "fetch + attributes (legacy)": lambda: fetch_and_read(legacy_make_record),
+            "fetch + attributes (registry)": lambda: fetch_and_read(sql.connection.make_record),
+            "100 fetchrow (legacy)": lambda: fetch_small(legacy_make_record),
+            "100 fetchrow (registry)": lambda: fetch_small(sql.connection.make_record),
+        }
+        for name, callback in results.items():
+            best = await best_of(repeat, callback)
+            print(f"{name:>30}: {best * 1000:8.2f} ms")
+    finally:
+        await con.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dsn", default=os.environ.get("POSTGRES"))
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if not args.dsn:
+        parser.error("a dsn must be given with --dsn or the POSTGRES environment variable")
+
+    asyncio.run(run(args.dsn, args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
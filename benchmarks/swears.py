@@ -0,0 +1,107 @@
+"""Benchmark swear counting on a synthetic message corpus.
+
+Run from the repository root with ``python -m benchmarks.swears``.
+"""
+import argparse
+import collections
+import random
+import timeit
+import typing
+
+from culturebot.components.swears import matcher, normalize
+
+FILLER = (
+    "the a an and or but so i you he she it we they me him her us them my your this that what why how when "
+    "is are was were be been have has had do did does not no yes just like really very lol lmao ok okay "
+    "game play win lose server channel message today tomorrow yesterday good bad nice cool time people"
+).split()
+
+
+def legacy_count_swears(text: str, swears: typing.Mapping[str, str]) -> collections.Counter[str]:
+    """Original implementation of swear counting."""
+    counter: collections.Counter[str] = collections.Counter()
+    for word in text.split():
+        for inflection in matcher.INFLECTIONS:
+            if word.endswith(inflection) and word.removesuffix(inflection) in swears:
+                counter.update({swears[word.removesuffix(inflection)]: 1})
+                break
+
+    return counter
+
+
+def make_corpus(
+    swears: typing.Mapping[str, str],
+    size: int = 10_000,
+    *,
+    swear_rate: float = 0.05,
+    seed: int = 0,
+) -> typing.List[str]:
+    """Create messages of random filler words sprinkled with inflected swears."""
+    rng = random.Random(seed)
+    words = list(swears)
+
+    corpus: typing.List[str] = []
+    for _ in range(size):
+        length = rng.randint(1, 40)
+        message = [
+            rng.choice(words) + rng.choice(matcher.INFLECTIONS) if rng.random() < swear_rate else rng.choice(FILLER)
+            for _ in range(length)
+        ]
+        corpus.append(" ".join(message))
+
+    return corpus
+
+
+def obfuscate(corpus: typing.Sequence[str], *, seed: int = 0) -> typing.List[str]:
+    """Obfuscate messages with the kind of noise real messages have."""
+    rng = random.Random(seed)
+    noise: typing.List[typing.Callable[[str], str]] = [
+        str.capitalize,
+        str.upper,
+        lambda word: word + rng.choice(",.!?"),
+        lambda word: ".".join(word),
+        lambda word: word.replace("i", "1").replace("o", "0").replace("s", "$"),
+        lambda word: word.translate({code: code + 0xFEE0 for code in range(0x21, 0x7F)}),
+    ]
+
+    return [
+        " ".join(rng.choice(noise)(word) if rng.random() < 0.2 else word for word in message.split())
+        for message in corpus
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--messages", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    swears = matcher.load_swears()
+    swear_matcher = matcher.SwearMatcher(swears)
+    corpus = make_corpus(swears, args.messages)
+
+    for message in corpus:
+        assert swear_matcher.count(message) == legacy_count_swears(message, swears), message
+
+    obfuscated = obfuscate(corpus)
+
+    results = {
+        "legacy": lambda: [legacy_count_swears(message, swears) for message in corpus],
+        "matcher": lambda: [swear_matcher.count(message) for message in corpus],
+        "matcher (obfuscated)": lambda: [swear_matcher.count(message) for message in obfuscated],
+        "split": lambda: [message.split() for message in corpus],
+        "normalize + split": lambda: [normalize.normalize(message).split() for message in corpus],
+        "split (obfuscated)": lambda: [message.split() for message in obfuscated],
+        "normalize + split (obfuscated)": lambda: [normalize.normalize(message).split() for message in obfuscated],
+    }
+    for name, callback in results.items():
+        best = min(timeit.repeat(callback, number=1, repeat=args.repeat))
+        print(f"{name:>30}: {best * 1000:8.2f} ms total, {best / len(corpus) * 1e6:6.2f} us/message")
+
+    found = sum(sum(swear_matcher.count(message).values()) for message in obfuscated)
+    legacy_found = sum(sum(legacy_count_swears(message, swears).values()) for message in obfuscated)
+    print(f"swears found in obfuscated messages: {found} (legacy: {legacy_found})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,3 @@
-from .client import build_gateway_bot
+from .client import build_connection, build_gateway_bot
 from .config import load_config
 from .sql import Connection
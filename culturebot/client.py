@@ -14,7 +14,7 @@ from ext import oauth, prettier
 from . import config, sql
 from .utility import files
 
-__all__ = ["build_gateway_bot"]
+__all__ = ["build_connection", "build_gateway_bot"]
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -45,6 +45,32 @@ async def closing(
         await session.close()
 
 
+def build_connection(configuration: config.Config) -> sql.Connection:
+    """Build the database connection of the bot."""
+    explainer = None
+    if configuration.database.explain_threshold is not None:
+        explainer = sql.QueryExplainer(
+            configuration.database.explain_threshold,
+            sample_rate=configuration.database.explain_sample_rate,
+            path=configuration.database.explain_file,
+        )
+
+    return sql.Connection(
+        configuration.tokens.postgres,
+        min_size=configuration.database.min_size,
+        max_size=configuration.database.max_size,
+        pools=dict(
+            background=dict(
+                min_size=configuration.database.background_min_size,
+                max_size=configuration.database.background_max_size,
+            ),
+        ),
+        explainer=explainer,
+        replica=configuration.tokens.postgres_replica,
+        read_your_writes=configuration.database.read_your_writes,
+    )
+
+
 def build_gateway_bot(
     configuration: typing.Optional[config.Config] = None,
 ) -> tuple[hikari.impl.GatewayBot, tanjun.Client]:
@@ -59,7 +85,7 @@ def build_gateway_bot(
         cache_settings=hikari.impl.CacheSettings(components=configuration.cache),
     )
 
-    connection = sql.Connection(configuration.tokens.postgres)
+    connection = build_connection(configuration)
 
     # TODO: on_error
     client = (
@@ -70,7 +96,7 @@ def build_gateway_bot(
         )
         .add_prefix(configuration.prefixes)
         .add_client_callback(tanjun.ClientCallbackNames.STARTING, connection.connect)
-        .add_client_callback(tanjun.ClientCallbackNames.CLOSING, connection.close)
+        .add_client_callback(tanjun.ClientCallbackNames.CLOSED, connection.close)
         .add_client_callback(tanjun.ClientCallbackNames.STARTING, starting)
         .add_client_callback(tanjun.ClientCallbackNames.CLOSING, closing)
         .set_type_dependency(sql.Connection, connection)
@@ -9,6 +9,9 @@ import tanchi
 import tanjun
 from hikari import snowflakes
 
+from culturebot import sql
+from culturebot.utility import Pipeline
+
 culturebot = tanjun.slash_command_group("culturebot", "Info about this bot")
 
 
@@ -43,6 +46,10 @@ async def about(
     me: hikari.OwnUser = tanjun.inject_lc(hikari.OwnUser),
     my_application: hikari.Application = tanjun.inject_lc(hikari.Application),
     cache: typing.Optional[hikari.api.Cache] = tanjun.inject(type=typing.Optional[hikari.api.Cache]),
+    connection: typing.Optional[sql.Connection] = tanjun.inject(type=typing.Optional[sql.Connection]),
+    pipeline: typing.Optional[Pipeline[typing.Tuple[hikari.Snowflake, hikari.ShardEvent]]] = tanjun.inject(
+        type=typing.Optional[Pipeline[typing.Tuple[hikari.Snowflake, hikari.ShardEvent]]]
+    ),
 ) -> None:
     """Get basic information about the current bot instance."""
     start_date = datetime.datetime.fromtimestamp(process.create_time())
@@ -80,6 +87,33 @@ async def about(
         cache_stats = "\n".join(cache_stats_lines)
         embed.add_field(name="Standard cache stats", value=f"```{cache_stats}```")
 
+    if connection is not None and connection.initialized:
+        latency = connection.metrics.latency()
+        acquire = connection.metrics.acquire
+        pool = connection.pool_metrics()
+        embed.add_field(
+            name="Database",
+            value=(
+                f"Queries: {latency.count} ({connection.metrics.errors} failed)\n"
+                f"Latency: {latency.average * 1000:.1f}ms avg, {latency.quantile(0.95) * 1000:.1f}ms p95\n"
+                f"Pool: {pool.in_use} in use, {pool.idle} idle of {pool.max_size}\n"
+                f"Acquire wait: {acquire.average * 1000:.1f}ms avg, {acquire.max * 1000:.1f}ms max"
+            ),
+            inline=True,
+        )
+
+    if pipeline is not None:
+        stats = pipeline.stats
+        embed.add_field(
+            name="Message pipeline",
+            value=(
+                f"Queued: {pipeline.depth}/{pipeline.max_size}\n"
+                f"Processed: {stats.processed} ({stats.failed} failed, {stats.dropped} dropped)\n"
+                f"Latency: {stats.average_latency * 1000:.1f}ms avg, {stats.max_latency * 1000:.1f}ms max"
+            ),
+            inline=True,
+        )
+
     await context.respond(embed=embed)
 
 
@@ -0,0 +1,148 @@
+import asyncio
+import dataclasses
+import logging
+import typing
+
+import hikari
+
+from culturebot import sql
+
+from .buffer import Key, SwearBuffer, add_increments
+from .dictionary import SwearDictionaries
+from .registry import SwearUserRegistry
+
+__all__ = ["BackfillResult", "SwearBackfill"]
+
+_LOGGER = logging.getLogger(__name__)
+
+CHECKPOINT_EXPRESSION = """
+INSERT INTO swears.backfill (channel_id, guild_id, message_id, done) VALUES ($1, $2, $3, $4)
+ON CONFLICT (channel_id) DO UPDATE SET message_id = $3, done = $4
+"""
+
+
+@dataclasses.dataclass
+class BackfillResult:
+    channels: int = 0
+    messages: int = 0
+    swears: int = 0
+
+
+class SwearBackfill:
+    """Counts swears in the message history of guilds.
+
+    History is streamed one page at a time and the counts of every page are written
+    in the same transaction as a per-channel checkpoint, so an interrupted run resumes
+    exactly where it stopped without counting anything twice.
+    """
+
+    rest: hikari.api.RESTClient
+    connection: sql.Connection
+    dictionaries: SwearDictionaries
+    registry: SwearUserRegistry
+    buffer: SwearBuffer
+    delay: float
+
+    _running: typing.Set[int]
+
+    def __init__(
+        self,
+        rest: hikari.api.RESTClient,
+        connection: sql.Connection,
+        dictionaries: SwearDictionaries,
+        registry: SwearUserRegistry,
+        buffer: SwearBuffer,
+        *,
+        delay: float = 1.0,
+    ) -> None:
+        self.rest = rest
+        self.connection = connection
+        self.dictionaries = dictionaries
+        self.registry = registry
+        self.buffer = buffer
+        self.delay = delay
+
+        self._running = set()
+
+    def is_running(self, guild_id: int) -> bool:
+        return guild_id in self._running
+
+    async def backfill_channel(
+        self,
+        guild_id: int,
+        channel_id: int,
+        before: hikari.Snowflake,
+        result: typing.Optional[BackfillResult] = None,
+    ) -> BackfillResult:
+        """Count swears of all messages in a channel sent before a message id."""
+        result = result or BackfillResult()
+
+        checkpoint = await self.connection.select(sql.models.BackfillCheckpoint, channel_id=channel_id)
+        if checkpoint and checkpoint.done:
+            return result
+
+        matcher = await self.dictionaries.matcher(guild_id)
+        after = hikari.Snowflake(checkpoint.message_id if checkpoint else 0)
+
+        async for page in self.rest.fetch_messages(channel_id, after=after).chunk(100):
+            # counts of a page are kept out of the shared buffer so no other flush writes them without the checkpoint
+            increments: typing.Dict[Key, int] = {}
+            done = False
+            for message in page:
+                if message.id >= before:
+                    done = True
+                    break
+
+                after = message.id
+                result.messages += 1
+
+                if not message.content or await self.registry.is_opted_out(guild_id, message.author.id):
+                    continue
+
+                if counter := matcher.count(message.content):
+                    add_increments(increments, message.author.id, guild_id, counter, message.timestamp)
+                    result.swears += sum(counter.values())
+
+            async def write_checkpoint(con: sql.Connection) -> None:
+                await con.execute(CHECKPOINT_EXPRESSION, channel_id, guild_id, after, done)
+
+            await self.buffer.flush(write_checkpoint, increments)
+
+            if done:
+                break
+
+            await asyncio.sleep(self.delay)
+        else:
+            await self.connection.execute(CHECKPOINT_EXPRESSION, channel_id, guild_id, after, True)
+
+        result.channels += 1
+        return result
+
+    async def backfill_guild(self, guild_id: int) -> BackfillResult:
+        """Count swears of all messages sent in a guild before the bot joined it."""
+        if guild_id in self._running:
+            raise RuntimeError(f"Guild {guild_id} is already being backfilled")
+
+        self._running.add(guild_id)
+        try:
+            me = await self.rest.fetch_my_user()
+            member = await self.rest.fetch_member(guild_id, me)
+            if member.joined_at is None:
+                raise RuntimeError(f"Cannot tell when the bot joined guild {guild_id}")
+
+            # everything after the bot joined has already been counted live
+            before = hikari.Snowflake.from_datetime(member.joined_at)
+
+            result = BackfillResult()
+            for channel in await self.rest.fetch_guild_channels(guild_id):
+                if not isinstance(channel, hikari.TextableGuildChannel):
+                    continue
+
+                try:
+                    await self.backfill_channel(guild_id, channel.id, before, result)
+                except (hikari.ForbiddenError, hikari.NotFoundError):
+                    _LOGGER.debug("Skipping channel %s which cannot be read", channel.id)
+
+            return result
+        finally:
+            self._running.discard(guild_id)
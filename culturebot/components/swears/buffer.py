@@ -0,0 +1,229 @@
+import asyncio
+import datetime
+import logging
+import typing
+
+from culturebot import sql
+
+from .leaderboard import SwearLeaderboard
+from .registry import SwearUserRegistry
+
+__all__ = ["SwearBuffer", "add_increments"]
+
+_LOGGER = logging.getLogger(__name__)
+
+Key = typing.Tuple[int, int, str, datetime.datetime]
+FlushCallback = typing.Callable[[sql.Connection], typing.Awaitable[typing.Any]]
+
+PARTITION_EXPRESSION = "SELECT swears.create_bucket_partition($1)"
+
+
+def floor_bucket(timestamp: datetime.datetime) -> datetime.datetime:
+    """Get the hourly bucket of a timestamp."""
+    return timestamp.astimezone(datetime.timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def add_increments(
+    increments: typing.Dict[Key, int],
+    user_id: int,
+    guild_id: int,
+    counter: typing.Mapping[str, int],
+    timestamp: typing.Optional[datetime.datetime] = None,
+) -> None:
+    """Merge swear increments of a user made at a specific time into pending increments."""
+    bucket = floor_bucket(timestamp or datetime.datetime.now(datetime.timezone.utc))
+
+    for swear, amount in counter.items():
+        key = (user_id, guild_id, swear, bucket)
+        increments[key] = increments.get(key, 0) + amount
+
+
+class SwearBuffer:
+    """Write-behind buffer which merges swear increments before writing them.
+
+    Increments are keyed by (user_id, guild_id, swear, hourly bucket) and written as one
+    batched upsert of both the lifetime counters and the hourly buckets either every
+    `interval` seconds or as soon as `max_size` distinct keys are pending.
+    """
+
+    connection: sql.Connection
+    registry: typing.Optional[SwearUserRegistry]
+    leaderboard: typing.Optional[SwearLeaderboard]
+    interval: float
+    max_size: int
+
+    _pending: typing.Dict[Key, int]
+    _partitions: typing.Set[datetime.date]
+
+    def __init__(
+        self,
+        connection: sql.Connection,
+        registry: typing.Optional[SwearUserRegistry] = None,
+        leaderboard: typing.Optional[SwearLeaderboard] = None,
+        *,
+        interval: float = 10.0,
+        max_size: int = 1000,
+    ) -> None:
+        self.connection = connection
+        self.registry = registry
+        self.leaderboard = leaderboard
+        self.interval = interval
+        self.max_size = max_size
+
+        self._pending = {}
+        self._partitions = set()
+        self._lock = asyncio.Lock()
+        self._task: typing.Optional[asyncio.Task[None]] = None
+        self._flush_task: typing.Optional[asyncio.Task[int]] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(
+        self,
+        user_id: int,
+        guild_id: int,
+        counter: typing.Mapping[str, int],
+        timestamp: typing.Optional[datetime.datetime] = None,
+    ) -> None:
+        """Add swear increments of a user made at a specific time."""
+        add_increments(self._pending, user_id, guild_id, counter, timestamp)
+
+        if len(self._pending) >= self.max_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(
+        self,
+        callback: typing.Optional[FlushCallback] = None,
+        increments: typing.Optional[typing.Mapping[Key, int]] = None,
+    ) -> int:
+        """Write all pending increments and return the amount of written rows.
+
+        The callback is awaited in the same transaction the increments are written in. Extra
+        increments are only ever written together with it, if writing fails they're dropped
+        instead of being retried by the next flush.
+        """
+        async with self._lock:
+            retried, self._pending = self._pending, {}
+            pending = dict(retried)
+            for key, amount in (increments or {}).items():
+                pending[key] = pending.get(key, 0) + amount
+
+            if not pending and callback is None:
+                return 0
+
+            users: typing.Set[typing.Tuple[int, int]] = set()
+            totals: typing.Mapping[typing.Tuple[int, int], int] = {}
+            months: typing.Set[datetime.date] = set()
+            prepared = committed = False
+            try:
+                async with self.connection.transaction() as con:
+                    if pending:
+                        users, totals, months = await self._write(con, pending)
+
+                    if callback is not None:
+                        await callback(con)
+
+                    # loads of the leaderboard may see the totals as soon as they're committed
+                    if self.leaderboard is not None:
+                        self.leaderboard.prepare(totals)
+                        prepared = True
+
+                committed = True
+            except Exception:
+                # put the increments back so they're retried on the next flush
+                for key, amount in retried.items():
+                    self._pending[key] = self._pending.get(key, 0) + amount
+
+                raise
+            finally:
+                if prepared and not committed and self.leaderboard is not None:
+                    self.leaderboard.release(totals)
+
+        self._partitions |= months
+        if self.registry is not None:
+            self.registry.mark_known(users)
+        if self.leaderboard is not None:
+            self.leaderboard.apply(totals)
+
+        _LOGGER.debug("Flushed %d swear counters", len(pending))
+        return len(pending)
+
+    async def _write(
+        self,
+        con: sql.Connection,
+        pending: typing.Mapping[Key, int],
+    ) -> typing.Tuple[
+        typing.Set[typing.Tuple[int, int]],
+        typing.Mapping[typing.Tuple[int, int], int],
+        typing.Set[datetime.date],
+    ]:
+        counters: typing.Dict[typing.Tuple[int, int, str], int] = {}
+        totals: typing.Dict[typing.Tuple[int, int], int] = {}
+        for (user_id, guild_id, swear, _), amount in pending.items():
+            counters[user_id, guild_id, swear] = counters.get((user_id, guild_id, swear), 0) + amount
+            totals[user_id, guild_id] = totals.get((user_id, guild_id), 0) + amount
+
+        users = set(totals)
+        if self.registry is not None:
+            users = {
+                (user_id, guild_id) for user_id, guild_id in users if not self.registry.is_known(guild_id, user_id)
+            }
+
+        await con.upsert_many(
+            sql.models.SwearUser,
+            [dict(user_id=user_id, guild_id=guild_id) for user_id, guild_id in users],
+        )
+        await con.upsert_many(
+            sql.models.Swear,
+            [
+                dict(user_id=user_id, guild_id=guild_id, swear=swear, amount=amount)
+                for (user_id, guild_id, swear), amount in counters.items()
+            ],
+            keys=("user_id", "guild_id", "swear"),
+            increment=("amount",),
+        )
+        await con.upsert_many(
+            sql.models.SwearTotal,
+            [dict(user_id=user_id, guild_id=guild_id, amount=amount) for (user_id, guild_id), amount in totals.items()],
+            keys=("guild_id", "user_id"),
+            increment=("amount",),
+        )
+
+        months = {bucket.date().replace(day=1) for *_, bucket in pending.keys()}
+        for month in months - self._partitions:
+            await con.execute(PARTITION_EXPRESSION, month)
+
+        await con.upsert_many(
+            "swears.bucket",
+            [
+                dict(user_id=user_id, guild_id=guild_id, swear=swear, bucket=bucket, amount=amount)
+                for (user_id, guild_id, swear, bucket), amount in pending.items()
+            ],
+            keys=("guild_id", "bucket", "user_id", "swear"),
+            increment=("amount",),
+        )
+
+        return users, totals, months
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+
+            try:
+                await self.flush()
+            except Exception:
+                _LOGGER.exception("Failed to flush swear counters")
+
+    def start(self) -> None:
+        """Start flushing periodically."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        """Stop flushing periodically and flush everything that is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        await self.flush()
@@ -0,0 +1,573 @@
+import collections
+import datetime
+import functools
+import os
+import tempfile
+import typing
+
+import alluka
+import hikari
+import tanchi
+import tanjun
+
+from culturebot import config, sql
+from culturebot.utility import Pipeline
+
+from .backfill import SwearBackfill
+from .buffer import SwearBuffer
+from .counters import MessageCounters
+from .dictionary import SwearDictionaries
+from .export import export_swears
+from .leaderboard import SwearLeaderboard
+from .matcher import load_swears
+from .registry import SwearUserRegistry
+
+component = tanjun.Component(name="swears")
+
+SWEARS = load_swears("swears.json")
+# upload limit of guilds without enough boosts, it used to be 8 MiB so that's assumed to stay safe
+MAX_UPLOAD_SIZE = 8 * 1024**2
+PREMIUM_UPLOAD_SIZES = {
+    hikari.GuildPremiumTier.TIER_2: 50 * 1024**2,
+    hikari.GuildPremiumTier.TIER_3: 100 * 1024**2,
+}
+
+
+def max_upload_size(guild: typing.Optional[hikari.Guild]) -> int:
+    """Get the size of the largest file which can be uploaded to a guild."""
+    if guild is None:
+        return MAX_UPLOAD_SIZE
+
+    return PREMIUM_UPLOAD_SIZES.get(hikari.GuildPremiumTier(guild.premium_tier), MAX_UPLOAD_SIZE)
+
+
+USER_EXPRESSION = "SELECT * FROM swears.swear WHERE user_id = $1 AND guild_id = $2 ORDER BY amount DESC LIMIT 10"
+GUILD_EXPRESSION = (
+    "SELECT swear.* FROM unnest($2::BIGINT[]) AS u(user_id) CROSS JOIN LATERAL ("
+    "SELECT * FROM swears.swear WHERE guild_id = $1 AND user_id = u.user_id ORDER BY amount DESC LIMIT 5"
+    ") AS swear"
+)
+TREND_EXPRESSION = (
+    "SELECT date_trunc($2, bucket, 'UTC') AS period, SUM(amount) AS amount FROM swears.bucket "
+    "WHERE guild_id = $1 AND bucket >= $3 GROUP BY 1 ORDER BY 1"
+)
+USER_TREND_EXPRESSION = (
+    "SELECT date_trunc($2, bucket, 'UTC') AS period, SUM(amount) AS amount FROM swears.bucket "
+    "WHERE guild_id = $1 AND bucket >= $3 AND user_id = $4 GROUP BY 1 ORDER BY 1"
+)
+
+
+# events are queued together with the id of the message they apply to
+MessageTask = typing.Tuple[hikari.Snowflake, hikari.ShardEvent]
+MessagePipeline = Pipeline[MessageTask]
+
+
+def message_key(task: MessageTask) -> int:
+    return hash(task[0])
+
+
+async def count_message(
+    event: hikari.GuildMessageCreateEvent,
+    *,
+    dictionaries: SwearDictionaries,
+    registry: SwearUserRegistry,
+    buffer: SwearBuffer,
+    counters: MessageCounters,
+) -> None:
+    """Count the swears of a message."""
+    assert event.content is not None
+
+    matcher = await dictionaries.matcher(event.guild_id)
+    counter = matcher.count(event.content)
+    if not counter:
+        return
+
+    if await registry.is_opted_out(event.guild_id, event.author.id):
+        return
+
+    buffer.add(event.author.id, event.guild_id, counter, event.message.timestamp)
+    counters.put(event.message_id, event.author.id, counter)
+
+
+async def recount_message(
+    event: hikari.GuildMessageUpdateEvent,
+    *,
+    dictionaries: SwearDictionaries,
+    registry: SwearUserRegistry,
+    buffer: SwearBuffer,
+    counters: MessageCounters,
+) -> None:
+    """Count the difference in swears of an edited message."""
+    # only edits of messages whose original count is known can be accounted for
+    if event.content is hikari.UNDEFINED or not counters.covers(event.message_id):
+        return
+
+    previous = counters.pop(event.message_id)
+    if previous is not None:
+        author_id, old = previous
+    elif event.author_id is not hikari.UNDEFINED:
+        author_id, old = event.author_id, collections.Counter[str]()
+    else:
+        return
+
+    if await registry.is_opted_out(event.guild_id, author_id):
+        return
+
+    matcher = await dictionaries.matcher(event.guild_id)
+    new = matcher.count(event.content) if event.content else collections.Counter[str]()
+
+    delta = {swear: new[swear] - old[swear] for swear in old.keys() | new.keys() if new[swear] != old[swear]}
+    if delta:
+        buffer.add(author_id, event.guild_id, delta, event.message_id.created_at)
+
+    counters.put(event.message_id, author_id, new)
+
+
+def uncount_message(
+    guild_id: int, message_id: hikari.Snowflake, buffer: SwearBuffer, counters: MessageCounters
+) -> None:
+    """Remove the swears of a deleted message."""
+    if (previous := counters.pop(message_id)) is None:
+        return
+
+    author_id, old = previous
+    buffer.add(author_id, guild_id, {swear: -amount for swear, amount in old.items()}, message_id.created_at)
+
+
+async def process_event(
+    task: MessageTask,
+    *,
+    dictionaries: SwearDictionaries,
+    registry: SwearUserRegistry,
+    buffer: SwearBuffer,
+    counters: MessageCounters,
+) -> None:
+    """Apply a message event to the swear counts of a message."""
+    message_id, event = task
+    if isinstance(event, hikari.GuildMessageCreateEvent):
+        await count_message(event, dictionaries=dictionaries, registry=registry, buffer=buffer, counters=counters)
+    elif isinstance(event, hikari.GuildMessageUpdateEvent):
+        await recount_message(event, dictionaries=dictionaries, registry=registry, buffer=buffer, counters=counters)
+    elif isinstance(event, (hikari.GuildMessageDeleteEvent, hikari.GuildBulkMessageDeleteEvent)):
+        uncount_message(event.guild_id, message_id, buffer, counters)
+
+
+@component.with_client_callback(tanjun.ClientCallbackNames.STARTING)
+async def starting(
+    client: alluka.Injected[tanjun.Client],
+    config: alluka.Injected[config.Config],
+    connection: alluka.Injected[sql.Connection],
+    rest: alluka.Injected[hikari.api.RESTClient],
+) -> None:
+    # flushes of the listener and backfills are kept off of the pool used by commands, the caches
+    # below are shared with the commands so their loads still use it
+    background = connection.using("background")
+    # these cache what they load until they're invalidated, which a lagging replica would make stale
+    primary = connection.primary
+
+    dictionaries = SwearDictionaries(primary, SWEARS)
+    registry = SwearUserRegistry(primary)
+    leaderboard = SwearLeaderboard(primary)
+    buffer = SwearBuffer(
+        background,
+        registry,
+        leaderboard,
+        interval=config.swears.flush_interval,
+        max_size=config.swears.flush_size,
+    )
+    buffer.start()
+    backfill = SwearBackfill(
+        rest,
+        background,
+        dictionaries,
+        registry,
+        buffer,
+        delay=config.swears.backfill_delay,
+    )
+    counters = MessageCounters(max_age=config.swears.counter_age, max_size=config.swears.counter_size)
+    pipeline = MessagePipeline(
+        functools.partial(
+            process_event,
+            dictionaries=dictionaries,
+            registry=registry,
+            buffer=buffer,
+            counters=counters,
+        ),
+        workers=config.swears.workers,
+        max_size=config.swears.queue_size,
+        key=message_key,
+    )
+    pipeline.start()
+
+    client.set_type_dependency(SwearDictionaries, dictionaries)
+    client.set_type_dependency(SwearUserRegistry, registry)
+    client.set_type_dependency(SwearLeaderboard, leaderboard)
+    client.set_type_dependency(SwearBuffer, buffer)
+    client.set_type_dependency(SwearBackfill, backfill)
+    client.set_type_dependency(MessageCounters, counters)
+    client.set_type_dependency(MessagePipeline, pipeline)
+
+
+@component.with_client_callback(tanjun.ClientCallbackNames.CLOSING)
+async def closing(
+    pipeline: alluka.Injected[typing.Optional[MessagePipeline]],
+    buffer: alluka.Injected[typing.Optional[SwearBuffer]],
+) -> None:
+    if pipeline:
+        await pipeline.close()
+    if buffer:
+        await buffer.close()
+
+
+@component.with_listener(hikari.GuildMessageCreateEvent)
+async def on_message(
+    event: hikari.GuildMessageCreateEvent,
+    *,
+    pipeline: alluka.Injected[MessagePipeline],
+) -> None:
+    if not event.content:
+        return
+
+    # messages are dropped rather than piling up tasks while the workers can't keep up
+    pipeline.submit((event.message_id, event))
+
+
+# all events of a message are processed in order by the same worker,
+# so edits and deletes are only applied after the message itself was counted
+@component.with_listener(hikari.GuildMessageUpdateEvent, hikari.GuildMessageDeleteEvent)
+async def on_message_change(
+    event: typing.Union[hikari.GuildMessageUpdateEvent, hikari.GuildMessageDeleteEvent],
+    *,
+    pipeline: alluka.Injected[MessagePipeline],
+) -> None:
+    pipeline.submit((event.message_id, event))
+
+
+@component.with_listener(hikari.GuildBulkMessageDeleteEvent)
+async def on_bulk_delete(
+    event: hikari.GuildBulkMessageDeleteEvent,
+    *,
+    pipeline: alluka.Injected[MessagePipeline],
+) -> None:
+    for message_id in event.message_ids:
+        pipeline.submit((message_id, event))
+
+
+@tanjun.with_owner_check
+@tanjun.with_guild_check
+@tanjun.as_message_command("backfill")
+async def backfill_swears(
+    context: tanjun.abc.MessageContext,
+    *,
+    backfill: alluka.Injected[SwearBackfill],
+) -> None:
+    """Count swears in the message history of this server."""
+    assert context.guild_id is not None
+
+    if backfill.is_running(context.guild_id):
+        raise tanjun.CommandError("This server is already being backfilled")
+
+    await context.respond("Backfilling swears of this server, this might take a while.", reply=True)
+    result = await backfill.backfill_guild(context.guild_id)
+
+    await context.respond(
+        f"Backfilled {result.channels} channels: found {result.swears} swears in {result.messages} messages.",
+        reply=True,
+    )
+
+
+swear_group = tanjun.slash_command_group("swears", "Swear commands")
+
+
+@swear_group.with_command
+@tanjun.with_guild_check
+@tanchi.as_slash_command("user")
+async def user_swears(
+    context: tanjun.context.SlashContext,
+    user: typing.Optional[hikari.Member] = None,
+    *,
+    connection: alluka.Injected[sql.Connection],
+    leaderboard: alluka.Injected[SwearLeaderboard],
+):
+    """View the swears of a user.
+
+    Args:
+        user: The user to view the swears of.
+    """
+    user = user or context.member
+    assert user is not None
+
+    swears = await connection.fetch(USER_EXPRESSION, user.id, context.guild_id, cls=sql.models.Swear)
+    if not swears:
+        await context.respond(f"{user} has never sworn in this server.")
+        return
+
+    total = await leaderboard.total(user.guild_id, user.id)
+
+    embed = hikari.Embed(
+        title=f"{user}'s top 10 swears",
+        color=0xFF0000,
+        description=f"List of the the top 10 most used swears out of **{total}** swears in total.",
+    )
+    embed.set_thumbnail(user.display_avatar_url)
+
+    for rank, swear in enumerate(swears, 1):
+        embed.add_field(
+            f"{rank}. {swear.swear}",
+            f"Used {swear.amount} time{'s' if swear.amount != 1 else ''}.",
+        )
+
+    await context.respond(embed=embed)
+
+
+@swear_group.with_command
+@tanjun.with_guild_check
+@tanchi.as_slash_command("rank")
+async def rank_swears(
+    context: tanjun.context.SlashContext,
+    user: typing.Optional[hikari.Member] = None,
+    *,
+    leaderboard: alluka.Injected[SwearLeaderboard],
+):
+    """View where a user ranks among the swearers of this server.
+
+    Args:
+        user: The user to view the rank of.
+    """
+    user = user or context.member
+    assert user is not None
+
+    rank = await leaderboard.rank(user.guild_id, user.id)
+    if rank is None:
+        await context.respond(f"{user} has never sworn in this server.")
+        return
+
+    await context.respond(
+        f"{user} ranks **#{rank.rank}** out of {rank.users} with **{rank.amount}** swears "
+        f"(top {rank.percentile:.1f}%)."
+    )
+
+
+@swear_group.with_command
+@tanjun.with_guild_check
+@tanchi.as_slash_command("optout")
+async def optout_swears(
+    context: tanjun.context.SlashContext,
+    optout: bool = True,
+    *,
+    registry: alluka.Injected[SwearUserRegistry],
+):
+    """Opt out of swear tracking in this server.
+
+    Args:
+        optout: Whether your swears should stop being tracked.
+    """
+    assert context.guild_id is not None
+
+    await registry.set_optout(context.guild_id, context.author.id, optout)
+
+    if optout:
+        await context.respond("Your swears will no longer be tracked in this server.")
+    else:
+        await context.respond("Your swears will be tracked in this server again.")
+
+
+@swear_group.with_command
+@tanjun.with_guild_check
+@tanjun.with_author_permission_check(hikari.Permissions.MANAGE_GUILD)
+@tanchi.as_slash_command("add")
+async def add_swear(
+    context: tanjun.context.SlashContext,
+    word: str,
+    alias: typing.Optional[str] = None,
+    *,
+    dictionaries: alluka.Injected[SwearDictionaries],
+):
+    """Add a swear to this server's dictionary.
+
+    Args:
+        word: The word to count as a swear.
+        alias: An existing swear the word should be counted as.
+    """
+    assert context.guild_id is not None
+
+    word = word.strip().lower()
+    if not word or len(word.split()) != 1:
+        raise tanjun.CommandError("A swear must be a single word")
+
+    swear = await dictionaries.add(context.guild_id, word, alias and alias.strip().lower())
+
+    if swear == word:
+        await context.respond(f"**{word}** is now counted as a swear.")
+    else:
+        await context.respond(f"**{word}** is now counted as **{swear}**.")
+
+
+@swear_group.with_command
+@tanjun.with_guild_check
+@tanjun.with_author_permission_check(hikari.Permissions.MANAGE_GUILD)
+@tanchi.as_slash_command("remove")
+async def remove_swear(
+    context: tanjun.context.SlashContext,
+    word: str,
+    *,
+    dictionaries: alluka.Injected[SwearDictionaries],
+):
+    """Remove a swear from this server's dictionary.
+
+    Args:
+        word: The word to stop counting as a swear.
+    """
+    assert context.guild_id is not None
+
+    word = word.strip().lower()
+    if not await dictionaries.remove(context.guild_id, word):
+        raise tanjun.CommandError(f"**{word}** is not a custom swear of this server")
+
+    await context.respond(f"**{word}** is no longer counted as a swear.")
+
+
+@swear_group.with_command
+@tanjun.with_guild_check
+@tanchi.as_slash_command("guild")
+async def guild_swears(
+    context: tanjun.context.SlashContext,
+    *,
+    connection: alluka.Injected[sql.Connection],
+    leaderboard: alluka.Injected[SwearLeaderboard],
+    cache: alluka.Injected[hikari.api.Cache],
+):
+    """View the swears of this guild."""
+    assert context.guild_id is not None
+
+    users = (await leaderboard.get(context.guild_id)).top(10)
+    if not users:
+        await context.respond("There are no swears in this server.")
+        return
+
+    user_ids = [user_id for user_id, _ in users]
+    swears = await connection.fetch(GUILD_EXPRESSION, context.guild_id, user_ids, cls=sql.models.Swear)
+
+    #
+    board: typing.Dict[int, typing.Tuple[int, typing.List[sql.models.Swear]]] = {
+        user_id: (total, []) for user_id, total in users
+    }
+    for swear in swears:
+        board[swear.user_id][1].append(swear)
+
+    embed = hikari.Embed(
+        title=f"Top 10 users.",
+        color=0xFF0000,
+        description="List of the the top 10 users with the most swears.",
+    )
+
+    for rank, (user_id, (total, swears)) in enumerate(board.items(), 1):
+        embed.add_field(
+            f"{rank}. {cache.get_user(user_id) or ''}",
+            f"<@{user_id}> has sworn a total of **{total}** times.\n"
+            f"Most common swears: {', '.join(f'**{swear.swear}**' for swear in swears[:5])}",
+        )
+
+    await context.respond(embed=embed)
+
+
+@swear_group.with_command
+@tanjun.with_guild_check
+@tanjun.with_author_permission_check(hikari.Permissions.MANAGE_GUILD)
+@tanchi.as_slash_command("export")
+async def export_guild_swears(
+    context: tanjun.context.SlashContext,
+    file_format: typing.Literal["csv", "jsonl"] = "csv",
+    *,
+    connection: alluka.Injected[sql.Connection],
+):
+    """Export all swears counted in this server.
+
+    Args:
+        file_format: The format of the exported file, it's always gzipped.
+    """
+    assert context.guild_id is not None
+
+    await context.defer()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"swears-{context.guild_id}.{file_format}.gz")
+        amount = await export_swears(connection.using("background"), context.guild_id, path, file_format)
+
+        # the guild is only known if it's cached, otherwise the smallest limit is assumed
+        if (size := os.path.getsize(path)) > (limit := max_upload_size(context.get_guild())):
+            raise tanjun.CommandError(
+                f"The export is too large to be uploaded ({size / 1024**2:.1f} MiB of at most {limit // 1024**2} MiB)"
+            )
+
+        await context.respond(f"Exported {amount} swear counters.", attachment=hikari.File(path))
+
+
+def format_trend(
+    amounts: typing.Mapping[datetime.datetime, int],
+    since: datetime.datetime,
+    step: datetime.timedelta,
+    fmt: str,
+) -> str:
+    """Format amounts per period as a bar chart."""
+    now = datetime.datetime.now(datetime.timezone.utc)
+    periods: typing.List[datetime.datetime] = []
+    while since <= now:
+        periods.append(since)
+        since += step
+
+    highest = max(amounts.values(), default=0) or 1
+    lines = [
+        f"`{period.strftime(fmt)}` {'█' * round(amounts.get(period, 0) / highest * 20)} {amounts.get(period, 0)}"
+        for period in periods
+    ]
+    return "\n".join(lines)
+
+
+@swear_group.with_command
+@tanjun.with_guild_check
+@tanchi.as_slash_command("trend")
+async def trend_swears(
+    context: tanjun.context.SlashContext,
+    user: typing.Optional[hikari.Member] = None,
+    days: int = 7,
+    *,
+    connection: alluka.Injected[sql.Connection],
+):
+    """View how much this server or a user has been swearing lately.
+
+    Args:
+        user: The user to view the trend of.
+        days: The amount of days to look back, hourly if it's just one.
+    """
+    if not 1 <= days <= 60:
+        raise tanjun.CommandError("Days must be between 1 and 60")
+
+    if days == 1:
+        granularity, step, fmt = "hour", datetime.timedelta(hours=1), "%H:00"
+    else:
+        granularity, step, fmt = "day", datetime.timedelta(days=1), "%b %d"
+
+    now = datetime.datetime.now(datetime.timezone.utc)
+    since = now.replace(minute=0, second=0, microsecond=0) - datetime.timedelta(days=days) + step
+    if granularity == "day":
+        since = since.replace(hour=0)
+
+    if user:
+        rows = await connection.fetch(USER_TREND_EXPRESSION, context.guild_id, granularity, since, user.id)
+    else:
+        rows = await connection.fetch(TREND_EXPRESSION, context.guild_id, granularity, since)
+    amounts = {row["period"]: row["amount"] for row in rows}
+
+    embed = hikari.Embed(
+        title=f"{user or 'Server'} swears over the last {days} day{'s' if days != 1 else ''}",
+        color=0xFF0000,
+        description=format_trend(amounts, since, step, fmt),
+    )
+    embed.set_footer(f"Sworn a total of {sum(amounts.values())} times, times are in UTC.")
+
+    await context.respond(embed=embed)
+
+
+component.load_from_scope()
+loader = component.make_loader()
@@ -0,0 +1,100 @@
+import collections
+import datetime
+import struct
+import typing
+
+import hikari
+
+__all__ = ["MessageCounters"]
+
+AUTHOR = struct.Struct("<Q")
+# amounts aren't clamped, an edit or delete has to subtract exactly what was added
+ENTRY = struct.Struct("<II")
+
+
+class MessageCounters:
+    """Bounded store of the swears counted in recent messages.
+
+    Every counter is packed into a single bytes object of the author id followed by
+    (swear index, amount) pairs with swears interned into a shared list. Messages without
+    swears aren't stored at all, counters are evicted once older than `max_age` seconds
+    or when more than `max_size` are stored.
+
+    `horizon` is the newest message id whose counter might be missing, any later message
+    which isn't stored is known to have had no swears.
+    """
+
+    max_age: float
+    max_size: int
+    horizon: hikari.Snowflake
+
+    _counters: collections.OrderedDict[int, bytes]
+    _swears: typing.List[str]
+    _indexes: typing.Dict[str, int]
+
+    def __init__(self, *, max_age: float = 86400.0, max_size: int = 100_000) -> None:
+        self.max_age = max_age
+        self.max_size = max_size
+        # nothing sent before now has been counted live
+        self.horizon = hikari.Snowflake.from_datetime(datetime.datetime.now(datetime.timezone.utc))
+
+        self._counters = collections.OrderedDict()
+        self._swears = []
+        self._indexes = {}
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    def _pack(self, author_id: int, counter: typing.Mapping[str, int]) -> bytes:
+        parts = [AUTHOR.pack(author_id)]
+        for swear, amount in counter.items():
+            if (index := self._indexes.get(swear)) is None:
+                index = self._indexes[swear] = len(self._swears)
+                self._swears.append(swear)
+
+            parts.append(ENTRY.pack(index, amount))
+
+        return b"".join(parts)
+
+    def _unpack(self, packed: bytes) -> typing.Tuple[int, collections.Counter[str]]:
+        (author_id,) = AUTHOR.unpack_from(packed)
+        counter = collections.Counter(
+            {self._swears[index]: amount for index, amount in ENTRY.iter_unpack(packed[AUTHOR.size :])}
+        )
+        return author_id, counter
+
+    def prune(self) -> None:
+        """Evict all counters which are too old."""
+        cutoff = hikari.Snowflake.from_datetime(
+            datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=self.max_age)
+        )
+        self.horizon = max(self.horizon, cutoff)
+
+        while self._counters and next(iter(self._counters)) <= self.horizon:
+            self._counters.popitem(last=False)
+
+    def covers(self, message_id: int) -> bool:
+        """Check whether the swears of a message are known."""
+        self.prune()
+        return message_id > self.horizon
+
+    def put(self, message_id: int, author_id: int, counter: typing.Mapping[str, int]) -> None:
+        """Store the swears counted in a message."""
+        counter = {swear: amount for swear, amount in counter.items() if amount > 0}
+        if not counter:
+            self._counters.pop(message_id, None)
+            return
+
+        self._counters[message_id] = self._pack(author_id, counter)
+
+        while len(self._counters) > self.max_size:
+            evicted, _ = self._counters.popitem(last=False)
+            self.horizon = max(self.horizon, hikari.Snowflake(evicted))
+
+    def pop(self, message_id: int) -> typing.Optional[typing.Tuple[int, collections.Counter[str]]]:
+        """Remove the swears counted in a message and return them with the author id."""
+        packed = self._counters.pop(message_id, None)
+        if packed is None:
+            return None
+
+        return self._unpack(packed)
@@ -0,0 +1,116 @@
+import asyncio
+import collections
+import typing
+
+from culturebot import sql
+
+from .matcher import SwearMatcher
+from .normalize import normalize
+
+__all__ = ["SwearDictionaries"]
+
+CUSTOM_EXPRESSION = "SELECT DISTINCT guild_id FROM swears.word"
+
+
+class SwearDictionaries:
+    """Per-guild swear dictionaries compiled into cached matchers.
+
+    Guilds without any custom words share the default matcher, the matchers of the others
+    are compiled on first use and kept in a LRU cache of at most `max_size` guilds.
+    """
+
+    connection: sql.Connection
+    swears: typing.Mapping[str, str]
+    default: SwearMatcher
+    max_size: int
+
+    _matchers: collections.OrderedDict[int, SwearMatcher]
+    _versions: typing.Dict[int, int]
+    _custom: typing.Optional[typing.Set[int]]
+    _loading: typing.Optional[asyncio.Task[None]]
+
+    def __init__(self, connection: sql.Connection, swears: typing.Mapping[str, str], *, max_size: int = 256) -> None:
+        self.connection = connection
+        self.swears = swears
+        self.default = SwearMatcher(swears)
+        self.max_size = max_size
+
+        self._matchers = collections.OrderedDict()
+        self._versions = {}
+        self._custom = None
+        self._loading = None
+
+    async def _load_custom(self) -> None:
+        rows = await self.connection.fetch(CUSTOM_EXPRESSION)
+        self._custom = {row["guild_id"] for row in rows}
+
+    async def _get_custom(self) -> typing.Set[int]:
+        if self._custom is None:
+            if self._loading is None or self._loading.done():
+                self._loading = asyncio.create_task(self._load_custom())
+
+            await self._loading
+
+        assert self._custom is not None
+        return self._custom
+
+    async def words(self, guild_id: int) -> typing.Mapping[str, str]:
+        """Get the merged dictionary of a guild."""
+        rows = await self.connection.select_row(sql.models.SwearWord, guild_id=guild_id)
+
+        swears = dict(self.swears)
+        swears.update({row.word: row.swear for row in rows})
+        return swears
+
+    async def matcher(self, guild_id: int) -> SwearMatcher:
+        """Get the compiled matcher of a guild."""
+        if (matcher := self._matchers.get(guild_id)) is not None:
+            self._matchers.move_to_end(guild_id)
+            return matcher
+
+        if guild_id not in await self._get_custom():
+            return self.default
+
+        version = self._versions.get(guild_id, 0)
+        matcher = SwearMatcher(await self.words(guild_id))
+
+        # the dictionary changed while it was being loaded
+        if self._versions.get(guild_id, 0) != version:
+            return matcher
+
+        self._matchers[guild_id] = matcher
+        while len(self._matchers) > self.max_size:
+            self._matchers.popitem(last=False)
+
+        return matcher
+
+    def invalidate(self, guild_id: int) -> None:
+        """Drop the compiled matcher of a guild."""
+        self._versions[guild_id] = self._versions.get(guild_id, 0) + 1
+        self._matchers.pop(guild_id, None)
+
+    async def add(self, guild_id: int, word: str, alias: typing.Optional[str] = None) -> str:
+        """Add a word to the dictionary of a guild and return the swear it counts as."""
+        swear = word
+        if alias is not None:
+            swear = (await self.matcher(guild_id)).table.get(normalize(alias), alias)
+
+        await self.connection.upsert(
+            sql.models.SwearWord,
+            keys=("guild_id", "word"),
+            guild_id=guild_id,
+            word=word,
+            swear=swear,
+        )
+
+        (await self._get_custom()).add(guild_id)
+        self.invalidate(guild_id)
+
+        return swear
+
+    async def remove(self, guild_id: int, word: str) -> bool:
+        """Remove a word from the dictionary of a guild."""
+        status = await self.connection.delete(sql.models.SwearWord, guild_id=guild_id, word=word)
+        self.invalidate(guild_id)
+
+        return status != "DELETE 0"
@@ -0,0 +1,59 @@
+import asyncio
+import csv
+import gzip
+import json
+import os
+import typing
+
+import asyncpg
+
+from culturebot import sql
+
+__all__ = ["EXPORT_FORMATS", "export_swears"]
+
+EXPORT_FORMATS = ("csv", "jsonl")
+COLUMNS = ("user_id", "swear", "amount")
+
+EXPORT_EXPRESSION = "SELECT user_id, swear, amount FROM swears.swear WHERE guild_id = $1 ORDER BY user_id, swear"
+
+
+def write_rows(file: typing.TextIO, fmt: str, rows: typing.Sequence[asyncpg.Record]) -> None:
+    if fmt == "csv":
+        csv.writer(file).writerows([row[column] for column in COLUMNS] for row in rows)
+    else:
+        file.writelines(json.dumps({column: row[column] for column in COLUMNS}) + "\n" for row in rows)
+
+
+async def export_swears(
+    connection: sql.Connection,
+    guild_id: int,
+    path: typing.Union[str, os.PathLike[str]],
+    fmt: str = "csv",
+    *,
+    batch_size: int = 1000,
+) -> int:
+    """Export all swears of a guild into a gzipped file and return the amount of rows.
+
+    Rows are streamed through a server-side cursor and compressed one batch at a time
+    so only `batch_size` rows are ever held in memory.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+
+    with gzip.open(path, "wt", newline="" if fmt == "csv" else None) as file:
+        if fmt == "csv":
+            csv.writer(file).writerow(COLUMNS)
+
+        amount = 0
+        # a single query always sees a consistent snapshot, however long streaming it takes
+        chunks = connection.iterate(EXPORT_EXPRESSION, guild_id, chunk_size=batch_size)
+        try:
+            async for rows in chunks:
+                # compression is cpu-bound so it's kept off the event loop
+                await asyncio.to_thread(write_rows, file, fmt, rows)
+                amount += len(rows)
+        finally:
+            # gives the cursor's connection back right away if writing failed
+            await chunks.aclose()
+
+    return amount
@@ -0,0 +1,185 @@
+import collections
+import dataclasses
+import heapq
+import typing
+
+from culturebot import sql
+
+__all__ = ["GuildLeaderboard", "SwearLeaderboard", "SwearRank"]
+
+TOP_EXPRESSION = "SELECT user_id, amount FROM swears.total WHERE guild_id = $1 ORDER BY amount DESC LIMIT $2"
+# both counts are index-only scans of total_guild_amount_idx, no swear rows are aggregated
+RANK_EXPRESSION = """
+SELECT
+    t.amount,
+    (SELECT count(*) FROM swears.total WHERE guild_id = $1 AND amount > t.amount) + 1 AS rank,
+    (SELECT count(*) FROM swears.total WHERE guild_id = $1 AND amount > 0) AS users
+FROM swears.total t WHERE t.guild_id = $1 AND t.user_id = $2
+"""
+
+
+@dataclasses.dataclass
+class SwearRank:
+    amount: int
+    rank: int
+    users: int
+
+    @property
+    def percentile(self) -> float:
+        """Percentage of users with at least as many swears."""
+        return self.rank / self.users * 100 if self.users else 100.0
+
+
+class GuildLeaderboard:
+    """Users with the most swears in a guild.
+
+    Only the top `capacity` users are kept. `outside` is an upper bound on the total
+    of every user that isn't kept, as long as no kept user drops below it the kept
+    users are guaranteed to be the actual top.
+    """
+
+    entries: typing.Dict[int, int]
+    capacity: int
+    outside: int
+    complete: bool
+
+    def __init__(self, entries: typing.Mapping[int, int], capacity: int, outside: typing.Optional[int] = None) -> None:
+        self.entries = dict(entries)
+        self.capacity = capacity
+        self.complete = outside is None
+        self.outside = outside or 0
+
+    def __contains__(self, user_id: int) -> bool:
+        return user_id in self.entries
+
+    def top(self, limit: int = 10) -> typing.Sequence[typing.Tuple[int, int]]:
+        """Get the top users and their totals."""
+        return heapq.nlargest(limit, self.entries.items(), key=lambda item: item[1])
+
+    def update(self, user_id: int, delta: int) -> bool:
+        """Apply a change in the total of a user.
+
+        Returns False if the leaderboard can no longer be guaranteed to be correct.
+        """
+        if user_id in self.entries:
+            self.entries[user_id] += delta
+            return self.entries[user_id] >= self.outside
+
+        if delta <= 0:
+            return True
+
+        if self.complete:
+            self.entries[user_id] = delta
+            if len(self.entries) > self.capacity:
+                evicted = min(self.entries, key=self.entries.__getitem__)
+                self.outside = self.entries.pop(evicted)
+                self.complete = False
+
+            return True
+
+        # the user was somewhere below the bound so they can at most be delta above it now
+        if self.outside + delta <= min(self.entries.values()):
+            self.outside += delta
+            return True
+
+        return False
+
+
+class SwearLeaderboard:
+    """Per-guild leaderboards kept up to date with flushed swear counts.
+
+    Leaderboards are loaded from the swears.total aggregate on demand
+    and kept for at most `max_guilds` recently used guilds.
+    """
+
+    connection: sql.Connection
+    capacity: int
+    max_guilds: int
+
+    _guilds: collections.OrderedDict[int, GuildLeaderboard]
+    _loading: typing.Dict[int, bool]
+    _flushing: typing.Dict[int, int]
+
+    def __init__(self, connection: sql.Connection, *, capacity: int = 50, max_guilds: int = 1000) -> None:
+        self.connection = connection
+        self.capacity = capacity
+        self.max_guilds = max_guilds
+
+        self._guilds = collections.OrderedDict()
+        self._loading = {}
+        self._flushing = {}
+
+    async def _load(self, guild_id: int) -> GuildLeaderboard:
+        rows = await self.connection.fetch(TOP_EXPRESSION, guild_id, self.capacity + 1)
+        entries = {row["user_id"]: row["amount"] for row in rows[: self.capacity]}
+
+        if len(rows) > self.capacity:
+            return GuildLeaderboard(entries, self.capacity, rows[self.capacity]["amount"])
+
+        return GuildLeaderboard(entries, self.capacity)
+
+    async def get(self, guild_id: int) -> GuildLeaderboard:
+        """Get the leaderboard of a guild."""
+        if (leaderboard := self._guilds.get(guild_id)) is not None:
+            self._guilds.move_to_end(guild_id)
+            return leaderboard
+
+        self._loading.setdefault(guild_id, False)
+        try:
+            leaderboard = await self._load(guild_id)
+        finally:
+            changed = self._loading.pop(guild_id, True)
+
+        # totals changed mid-load so there's no telling whether the load saw them
+        if changed or guild_id in self._flushing:
+            return leaderboard
+
+        self._guilds[guild_id] = leaderboard
+        while len(self._guilds) > self.max_guilds:
+            self._guilds.popitem(last=False)
+
+        return leaderboard
+
+    async def total(self, guild_id: int, user_id: int) -> int:
+        """Get the total amount of swears of a user."""
+        if (leaderboard := self._guilds.get(guild_id)) is not None and user_id in leaderboard:
+            return leaderboard.entries[user_id]
+
+        total = await self.connection.select(sql.models.SwearTotal, guild_id=guild_id, user_id=user_id)
+        return total.amount if total else 0
+
+    async def rank(self, guild_id: int, user_id: int) -> typing.Optional[SwearRank]:
+        """Get the rank of a user among all users of a guild."""
+        row = await self.connection.fetchrow(RANK_EXPRESSION, guild_id, user_id)
+        if row is None or row["amount"] <= 0:
+            return None
+
+        return SwearRank(row["amount"], row["rank"], row["users"])
+
+    def prepare(self, deltas: typing.Mapping[typing.Tuple[int, int], int]) -> None:
+        """Mark (user_id, guild_id) totals as about to be committed.
+
+        Must be called before the commit, leaderboards loaded from then on until the changes are
+        applied or released aren't kept since they might've already seen the committed totals.
+        """
+        for guild_id in {guild_id for _, guild_id in deltas}:
+            self._flushing[guild_id] = self._flushing.get(guild_id, 0) + 1
+            if guild_id in self._loading:
+                self._loading[guild_id] = True
+
+    def release(self, deltas: typing.Mapping[typing.Tuple[int, int], int]) -> None:
+        """Release prepared totals which weren't committed."""
+        for guild_id in {guild_id for _, guild_id in deltas}:
+            if (count := self._flushing.get(guild_id, 0) - 1) > 0:
+                self._flushing[guild_id] = count
+            else:
+                self._flushing.pop(guild_id, None)
+
+    def apply(self, deltas: typing.Mapping[typing.Tuple[int, int], int]) -> None:
+        """Apply committed changes of prepared (user_id, guild_id) totals to loaded leaderboards."""
+        for (user_id, guild_id), delta in deltas.items():
+            leaderboard = self._guilds.get(guild_id)
+            if leaderboard is not None and not leaderboard.update(user_id, delta):
+                del self._guilds[guild_id]
+
+        self.release(deltas)
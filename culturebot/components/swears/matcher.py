@@ -0,0 +1,94 @@
+import collections
+import json
+import os
+import re
+import typing
+
+from .normalize import MASK, normalize
+
+__all__ = ["INFLECTIONS", "SwearMatcher", "load_swears"]
+
+INFLECTIONS = ["", "s", "es", "ed", "ing", "in", "ly", "ed", "er", "est"]
+# masked words which were already looked up, per matcher
+MAX_MASKED = 1024
+
+
+def load_swears(path: typing.Union[str, os.PathLike[str]] = "swears.json") -> typing.Mapping[str, str]:
+    """Load swears and their aliases as a mapping of word to swear."""
+    with open(path) as file:
+        data = json.load(file)
+
+    swears: typing.Dict[str, str] = {swear: swear for swear in data["swears"]}
+    swears.update(data["aliases"])
+    return swears
+
+
+class SwearMatcher:
+    """Matcher compiled from a mapping of swears.
+
+    Every inflected form of every swear is expanded into a single lookup table
+    so counting a normalized message costs one dictionary lookup per word.
+
+    Masked letters match any letter, a masked word only counts if every word it
+    could be is the same swear.
+    """
+
+    table: typing.Mapping[str, str]
+
+    _lengths: typing.Optional[typing.Mapping[int, typing.Sequence[typing.Tuple[str, str]]]]
+    _masked: typing.Dict[str, typing.Optional[str]]
+
+    def __init__(self, swears: typing.Mapping[str, str], inflections: typing.Sequence[str] = INFLECTIONS) -> None:
+        table: typing.Dict[str, str] = {}
+
+        # earlier inflections take priority just like when stripping them in order
+        for inflection in inflections:
+            for word, swear in swears.items():
+                table.setdefault(normalize(word) + inflection, swear)
+
+        self.table = table
+        self._lengths = None
+        self._masked = {}
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.table
+
+    def _unmask(self, word: str) -> typing.Optional[str]:
+        # a mask has to hide part of a word rather than all of it
+        if not word.strip(MASK):
+            return None
+
+        if self._lengths is None:
+            lengths: typing.Dict[int, typing.List[typing.Tuple[str, str]]] = collections.defaultdict(list)
+            for candidate, swear in self.table.items():
+                lengths[len(candidate)].append((candidate, swear))
+
+            self._lengths = lengths
+
+        pattern = re.compile(".".join(map(re.escape, word.split(MASK))))
+        swears = {swear for candidate, swear in self._lengths.get(len(word), ()) if pattern.fullmatch(candidate)}
+        return swears.pop() if len(swears) == 1 else None
+
+    def match(self, word: str) -> typing.Optional[str]:
+        """Get the swear a normalized word counts as."""
+        if (swear := self.table.get(word)) is not None or MASK not in word:
+            return swear
+
+        if word not in self._masked:
+            if len(self._masked) >= MAX_MASKED:
+                self._masked.clear()
+
+            self._masked[word] = self._unmask(word)
+
+        return self._masked[word]
+
+    def count(self, text: str) -> collections.Counter[str]:
+        """Count swears in text."""
+        normalized = normalize(text)
+        if MASK in normalized:
+            return collections.Counter(filter(None, map(self.match, normalized.split())))
+
+        return collections.Counter(filter(None, map(self.table.get, normalized.split())))
@@ -0,0 +1,107 @@
+import re
+import string
+import typing
+import unicodedata
+
+__all__ = ["MASK", "normalize"]
+
+LEETSPEAK = {"0": "o", "1": "i", "3": "e", "4": "a", "5": "s", "7": "t", "@": "a", "$": "s"}
+
+# lowercase letters of other scripts which look identical to latin ones
+CONFUSABLES = {
+    # cyrillic
+    "а": "a",
+    "в": "b",
+    "е": "e",
+    "ё": "e",
+    "і": "i",
+    "ї": "i",
+    "ј": "j",
+    "к": "k",
+    "м": "m",
+    "н": "h",
+    "о": "o",
+    "р": "p",
+    "с": "c",
+    "т": "t",
+    "у": "y",
+    "х": "x",
+    "ѕ": "s",
+    "ԁ": "d",
+    "ԛ": "q",
+    "ԝ": "w",
+    # greek
+    "α": "a",
+    "β": "b",
+    "ε": "e",
+    "ι": "i",
+    "κ": "k",
+    "ν": "v",
+    "ο": "o",
+    "ρ": "p",
+    "τ": "t",
+    "υ": "u",
+    "χ": "x",
+}
+
+# characters commonly used to split up a single word, any other punctuation separates words
+JOINERS = ".-_'`~^|"
+# stands in for a hidden letter, it's kept so the matcher can fill it in
+MASK = "*"
+SEPARATORS = "".join(char for char in string.punctuation if char not in JOINERS + MASK and char not in LEETSPEAK)
+
+UNICODE_JOINERS = "‘’·\u00ad\u200b\u200c\u200d\u2060\ufeff"
+COMBINING = [range(0x0300, 0x0370), range(0x1AB0, 0x1B00), range(0x1DC0, 0x1E00), range(0x20D0, 0x2100)]
+UNICODE_SEPARATORS = "«»“”…–—•"
+
+ASCII_TABLE = bytes.maketrans(
+    (string.ascii_uppercase + SEPARATORS).encode(),
+    (string.ascii_lowercase + " " * len(SEPARATORS)).encode(),
+)
+ASCII_DELETE = JOINERS.encode()
+
+UNICODE_TABLE: typing.Dict[int, typing.Optional[str]] = {
+    **{ord(char): replacement for char, replacement in CONFUSABLES.items()},
+    **{ord(char): " " for char in SEPARATORS + UNICODE_SEPARATORS},
+    **{ord(char): None for char in JOINERS + UNICODE_JOINERS},
+    **{codepoint: None for block in COMBINING for codepoint in block},
+}
+
+LEETSPEAK_TABLE = str.maketrans(LEETSPEAK)
+
+_PLAIN = re.compile(r"[^a-z\s]")
+# a run of dots is an ellipsis between words rather than part of one
+_ELLIPSIS = re.compile(r"\.{2,}")
+# masks around a whole word are markdown emphasis and don't hide anything
+_EMPHASIS = re.compile(r"(?<!\S)\*+(\S+?)\*+(?!\S)")
+_LEETSPEAK_WORD = re.compile(r"\S*[" + re.escape("".join(LEETSPEAK)) + r"]\S*")
+_LETTER = re.compile(r"[^\W\d_]")
+
+
+def _leetspeak(match: "re.Match[str]") -> str:
+    # numbers on their own are left alone, "455 points" shouldn't be a swear
+    word = match[0]
+    return word.translate(LEETSPEAK_TABLE) if _LETTER.search(word) else word
+
+
+def normalize(text: str) -> str:
+    """Undo common swear obfuscation.
+
+    Case, leetspeak, punctuation inside of words, fullwidth and confusable characters and diacritics are all normalized.
+    Leetspeak is only undone in words which also contain letters, ellipses separate words and masked letters are
+    kept as `MASK`.
+    Plain lowercase ascii text is returned as is.
+    """
+    if text.isascii():
+        if _PLAIN.search(text) is None:
+            return text
+
+        text = _ELLIPSIS.sub(" ", text).encode().translate(ASCII_TABLE, ASCII_DELETE).decode()
+    else:
+        # decomposition turns an ellipsis character into dots
+        text = _ELLIPSIS.sub(" ", unicodedata.normalize("NFKD", text)).casefold().translate(UNICODE_TABLE)
+
+    if MASK in text:
+        text = _EMPHASIS.sub(r"\1", text)
+
+    return _LEETSPEAK_WORD.sub(_leetspeak, text)
@@ -0,0 +1,84 @@
+import asyncio
+import typing
+
+from culturebot import sql
+
+__all__ = ["SwearUserRegistry"]
+
+
+class SwearUserRegistry:
+    """In-memory registry of known and opted out swear users.
+
+    Guilds are loaded lazily from swears.user the first time they're needed,
+    after that every lookup is answered without touching the database.
+    """
+
+    connection: sql.Connection
+
+    _known: typing.Dict[int, typing.Set[int]]
+    _optouts: typing.Dict[int, typing.Set[int]]
+    _loading: typing.Dict[int, asyncio.Task[None]]
+
+    def __init__(self, connection: sql.Connection) -> None:
+        self.connection = connection
+
+        self._known = {}
+        self._optouts = {}
+        self._loading = {}
+
+    def __contains__(self, guild_id: int) -> bool:
+        return guild_id in self._known
+
+    async def _load(self, guild_id: int) -> None:
+        users = await self.connection.select_row(sql.models.SwearUser, guild_id=guild_id)
+
+        self._known[guild_id] = {user.user_id for user in users}
+        self._optouts[guild_id] = {user.user_id for user in users if user.optout}
+
+    async def load(self, guild_id: int) -> None:
+        """Load all users of a guild if they aren't loaded yet."""
+        if guild_id in self._known:
+            return
+
+        if (task := self._loading.get(guild_id)) is None:
+            task = self._loading[guild_id] = asyncio.create_task(self._load(guild_id))
+
+        try:
+            await task
+        finally:
+            self._loading.pop(guild_id, None)
+
+    def is_known(self, guild_id: int, user_id: int) -> bool:
+        """Check whether a user is known to be stored in the database."""
+        return user_id in self._known.get(guild_id, ())
+
+    async def is_opted_out(self, guild_id: int, user_id: int) -> bool:
+        """Check whether a user has opted out of swear tracking."""
+        if guild_id not in self._known:
+            await self.load(guild_id)
+
+        return user_id in self._optouts[guild_id]
+
+    def mark_known(self, users: typing.Iterable[typing.Tuple[int, int]]) -> None:
+        """Mark (user_id, guild_id) pairs as stored in the database."""
+        for user_id, guild_id in users:
+            if guild_id in self._known:
+                self._known[guild_id].add(user_id)
+
+    async def set_optout(self, guild_id: int, user_id: int, optout: bool) -> None:
+        """Store whether a user has opted out of swear tracking."""
+        await self.load(guild_id)
+
+        await self.connection.upsert(
+            sql.models.SwearUser,
+            keys=("user_id", "guild_id"),
+            user_id=user_id,
+            guild_id=guild_id,
+            optout=optout,
+        )
+
+        self._known[guild_id].add(user_id)
+        if optout:
+            self._optouts[guild_id].add(user_id)
+        else:
+            self._optouts[guild_id].discard(user_id)
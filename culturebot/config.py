@@ -17,6 +17,8 @@ class Tokens(setei.Config):
     bot: str = setei.env("BOT_TOKEN")
 
     postgres: str = setei.env("POSTGRES")
+    # read-only queries are spread to the replica if there is one
+    postgres_replica: typing.Optional[str] = setei.env("POSTGRES_REPLICA")
 
     google_api_key: typing.Optional[str] = setei.env("GOOGLE_API_KEY")
     google_client_id: typing.Optional[str] = setei.env("GOOGLE_CLIENT_ID")
@@ -41,6 +43,31 @@ class Memebin(setei.Config):
     user: str = setei.conf("memebin.user")
 
 
+class Database(setei.Config):
+    min_size: int = setei.conf("database.min_size", default=4)
+    max_size: int = setei.conf("database.max_size", default=10)
+    # flushes of the listener, backfills and exports don't compete with commands for connections,
+    # loads of the swear caches triggered by the listener still share the default pool
+    background_min_size: int = setei.conf("database.background.min_size", default=1)
+    background_max_size: int = setei.conf("database.background.max_size", default=4)
+    # plans of a sample of statements slower than the threshold are written to the file
+    explain_threshold: typing.Optional[float] = setei.conf("database.explain.threshold", default=None)
+    explain_sample_rate: float = setei.conf("database.explain.sample_rate", default=0.1)
+    explain_file: str = setei.conf("database.explain.file", default="explain.log")
+    # seconds after a write during which the writing task only reads from the primary
+    read_your_writes: float = setei.conf("database.read_your_writes", default=5.0)
+
+
+class Swears(setei.Config):
+    flush_interval: float = setei.conf("swears.flush_interval", default=10.0)
+    flush_size: int = setei.conf("swears.flush_size", default=1000)
+    backfill_delay: float = setei.conf("swears.backfill_delay", default=1.0)
+    workers: int = setei.conf("swears.workers", default=4)
+    queue_size: int = setei.conf("swears.queue_size", default=1000)
+    counter_age: float = setei.conf("swears.counter_age", default=86400.0)
+    counter_size: int = setei.conf("swears.counter_size", default=100_000)
+
+
 class Config(setei.Config):
     tokens: Tokens
 
@@ -50,7 +77,9 @@ class Config(setei.Config):
     cache: hikari.api.CacheComponents = setei.conf("cache", default=hikari.api.CacheComponents.ALL)
     declare_global_commands: typing.Union[typing.List[hikari.Snowflake], bool] = setei.conf("test_guilds", default=True)
 
+    database: Database
     memebin: Memebin
+    swears: Swears
 
 
 _cached: Config = NotImplemented
@@ -1,2 +1,9 @@
 from . import models
+from .batch import *
+from .cache import *
 from .connection import *
+from .explain import *
+from .memory import *
+from .metrics import *
+from .migrate import *
+from .notify import *
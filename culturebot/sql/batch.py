@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import typing
+
+import asyncpg
+
+__all__ = ["Batch"]
+
+Statement = typing.Tuple[str, str, typing.Tuple[typing.Any, ...]]
+
+
+class Batch:
+    """Statements queued to be sent together on a single connection.
+
+    Consecutive executions of the same statement are sent with a single pipelined executemany,
+    postgres doesn't report their statuses so their results are None.
+    """
+
+    results: typing.List[typing.Any]
+
+    _statements: typing.List[Statement]
+
+    def __init__(self) -> None:
+        self.results = []
+        self._statements = []
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    def execute(self, query: str, *args: typing.Any) -> int:
+        """Queue a statement and return the index of its result."""
+        self._statements.append(("execute", query, args))
+        return len(self._statements) - 1
+
+    def fetch(self, query: str, *args: typing.Any) -> int:
+        """Queue a query returning rows and return the index of its result."""
+        self._statements.append(("fetch", query, args))
+        return len(self._statements) - 1
+
+    def fetchrow(self, query: str, *args: typing.Any) -> int:
+        """Queue a query returning a single row and return the index of its result."""
+        self._statements.append(("fetchrow", query, args))
+        return len(self._statements) - 1
+
+    async def send(self, con: asyncpg.Connection[asyncpg.Record]) -> typing.Sequence[typing.Any]:
+        """Send all queued statements and return their results in order."""
+        statements, self._statements = self._statements, []
+
+        index = 0
+        while index < len(statements):
+            kind, query, args = statements[index]
+
+            end = index + 1
+            if kind == "execute" and args:
+                while end < len(statements) and statements[end][:2] == ("execute", query) and statements[end][2]:
+                    end += 1
+
+            if end - index > 1:
+                await con.executemany(query, [args for _, _, args in statements[index:end]])
+                self.results += [None] * (end - index)
+            else:
+                self.results.append(await getattr(con, kind)(query, *args))
+
+            index = end
+
+        return self.results
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import collections
+import time
+import typing
+
+__all__ = ["TableCache"]
+
+Key = typing.Tuple[type, typing.Tuple[typing.Tuple[str, typing.Any], ...]]
+
+MISSING = object()
+
+
+def _matches(key: Key, values: typing.Mapping[str, typing.Any]) -> bool:
+    """Check whether a row with some known values could be the one a cached select filtered for."""
+    _, where = key
+    return all(values.get(column, value) == value for column, value in where)
+
+
+class TableCache:
+    """Read-through cache of rows selected from a single table.
+
+    Rows are kept for at most `ttl` seconds and only the `max_size` most recently
+    used ones are kept. Results of selects which didn't find anything are cached too.
+    """
+
+    ttl: float
+    max_size: int
+    version: int
+    invalidated: float
+
+    _rows: collections.OrderedDict[Key, typing.Tuple[float, typing.Any]]
+
+    def __init__(self, *, ttl: float = 60.0, max_size: int = 1024) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.version = 0
+        self.invalidated = float("-inf")
+
+        self._rows = collections.OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @staticmethod
+    def make_key(model: type, where: typing.Mapping[str, typing.Any]) -> Key:
+        return model, tuple(sorted(where.items()))
+
+    def get(self, key: Key) -> typing.Any:
+        """Get a cached row, `MISSING` if there's nothing cached."""
+        if (entry := self._rows.get(key)) is None:
+            return MISSING
+
+        expires, row = entry
+        if expires < time.monotonic():
+            del self._rows[key]
+            return MISSING
+
+        self._rows.move_to_end(key)
+        return row
+
+    def set(self, key: Key, row: typing.Any, version: int) -> None:
+        """Cache a row unless the table was written to since `version`."""
+        if version != self.version:
+            return
+
+        self._rows[key] = (time.monotonic() + self.ttl, row)
+        self._rows.move_to_end(key)
+        while len(self._rows) > self.max_size:
+            self._rows.popitem(last=False)
+
+    def invalidate(self, *rows: typing.Mapping[str, typing.Any]) -> None:
+        """Drop every cached row which could've been affected by a write of rows with some known values.
+
+        Without any rows the whole table is dropped.
+        """
+        self.version += 1
+        self.invalidated = time.monotonic()
+
+        if not rows:
+            self._rows.clear()
+            return
+
+        for key in [key for key in self._rows if any(_matches(key, row) for row in rows)]:
+            del self._rows[key]
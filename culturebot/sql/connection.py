@@ -1,15 +1,33 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import contextvars
+import copy
+import dataclasses
+import functools
+import operator
 import os
 import pathlib
+import time
 import typing
 
 import asyncpg
 
+from . import migrate
+from .batch import Batch
+from .cache import MISSING, TableCache
+from .explain import QueryExplainer
+from .metrics import PoolMetrics, QueryMetrics
+from .notify import CHANNEL, InvalidationBus
+
 __all__ = ["Connection", "make_eq", "make_s"]
 
 T = typing.TypeVar("T")
 
+# when the current task last wrote, reads right after their own writes can't be served by a lagging replica
+_last_write: contextvars.ContextVar[float] = contextvars.ContextVar("last_write", default=float("-inf"))
+
 
 class AttributeRecord(asyncpg.Record):
     def __getattr__(self, key: str) -> typing.Any:
@@ -19,11 +37,30 @@ class AttributeRecord(asyncpg.Record):
             raise AttributeError(*e.args) from e
 
 
+_record_classes: typing.Dict[type, typing.Type[asyncpg.Record]] = {}
+
+
 def make_record(cls: typing.Type[T]) -> typing.Type[T]:
-    cls = type(cls.__name__, (AttributeRecord, cls), {})  # type: ignore
-    cls.__new__ = object.__new__
-    cls.__init__ = object.__init__
-    return cls
+    """Get the record class of a model, it's only ever created once per model.
+
+    Every field of the model becomes a property reading the column of the same name,
+    other columns are still reachable through the attribute fallback.
+    """
+    if (record := _record_classes.get(cls)) is not None:
+        return typing.cast("typing.Type[T]", record)
+
+    if dataclasses.is_dataclass(cls):
+        names = [field.name for field in dataclasses.fields(cls)]
+    else:
+        names = list(getattr(cls, "__annotations__", {}))
+
+    # properties also take priority over default values of the model
+    namespace: typing.Dict[str, typing.Any] = {name: property(operator.itemgetter(name)) for name in names}
+    namespace.update(__new__=object.__new__, __init__=object.__init__)
+
+    record = type(cls.__name__, (AttributeRecord, cls), namespace)
+    _record_classes[cls] = record
+    return typing.cast("typing.Type[T]", record)
 
 
 def make_eq(start: int = 1, **kwargs: typing.Any):
@@ -49,9 +86,138 @@ def only_truthy(
     return {k: v for k, v in kwargs.items() if v}
 
 
+def _tablename(table: typing.Union[str, type]) -> str:
+    return table if isinstance(table, str) else getattr(table, "__tablename__")
+
+
+def _equals(columns: typing.Iterable[str], start: int = 1) -> typing.List[str]:
+    return [f"{column} = ${n}" for n, column in enumerate(columns, start)]
+
+
+# generated statements are memoized by their table and columns, the query text being identical
+# every time also lets asyncpg reuse the statement it already prepared on each pooled connection,
+# which is why pools are created with an explicit statement cache size
+@functools.lru_cache(maxsize=1024)
+def _select_query(table: str, columns: typing.Tuple[str, ...]) -> str:
+    where = " AND ".join(_equals(columns))
+    return f"SELECT * FROM {table} WHERE {where}"
+
+
+@functools.lru_cache(maxsize=1024)
+def _insert_query(table: str, columns: typing.Tuple[str, ...]) -> str:
+    values = ", ".join(make_s(len(columns)))
+    return f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({values})"
+
+
+@functools.lru_cache(maxsize=1024)
+def _update_query(
+    table: str,
+    columns: typing.Tuple[str, ...],
+    where: typing.Union[str, typing.Tuple[str, ...]],
+) -> str:
+    values = ", ".join(_equals(columns))
+    if isinstance(where, str):
+        where_str = where
+    else:
+        where_str = " AND ".join(_equals(where, start=len(columns) + 1))
+
+    return f"UPDATE {table} SET {values} WHERE {where_str}"
+
+
+@functools.lru_cache(maxsize=1024)
+def _upsert_query(table: str, columns: typing.Tuple[str, ...], keys: typing.Tuple[str, ...]) -> str:
+    values = ", ".join(make_s(len(columns)))
+    conflict_values = ", ".join(_equals(columns))
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({values}) "
+        f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {conflict_values}"
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def _delete_query(table: str, columns: typing.Tuple[str, ...]) -> str:
+    where = " AND ".join(_equals(columns))
+    return f"DELETE FROM {table} WHERE {where}"
+
+
+def _unnest(columns: typing.Sequence[str], types: typing.Mapping[str, str]) -> str:
+    return ", ".join(f"${n}::{types[column]}[]" for n, column in enumerate(columns, 1))
+
+
+def _upsert_many_query(
+    table: str,
+    columns: typing.Tuple[str, ...],
+    types: typing.Mapping[str, str],
+    keys: typing.Tuple[str, ...],
+    increment: typing.Tuple[str, ...],
+) -> str:
+    updates = [
+        f"{column} = target.{column} + excluded.{column}" if column in increment else f"{column} = excluded.{column}"
+        for column in columns
+        if column not in keys
+    ]
+    action = f"DO UPDATE SET {', '.join(updates)}" if updates else "DO NOTHING"
+    return (
+        f"INSERT INTO {table} AS target ({', '.join(columns)}) SELECT * FROM unnest({_unnest(columns, types)}) "
+        f"ON CONFLICT ({', '.join(keys)}) {action}"
+    )
+
+
+def _delete_many_query(table: str, columns: typing.Tuple[str, ...], types: typing.Mapping[str, str]) -> str:
+    where = " AND ".join(f"target.{column} = source.{column}" for column in columns)
+    return (
+        f"DELETE FROM {table} AS target USING unnest({_unnest(columns, types)}) AS source ({', '.join(columns)}) "
+        f"WHERE {where}"
+    )
+
+
+def _as_mapping(row: typing.Any) -> typing.Mapping[str, typing.Any]:
+    if dataclasses.is_dataclass(row) and not isinstance(row, type):
+        return {field.name: getattr(row, field.name) for field in dataclasses.fields(row)}
+
+    return dict(row.items())
+
+
+def _columns(
+    rows: typing.Sequence[typing.Mapping[str, typing.Any]],
+    columns: typing.Optional[typing.Sequence[str]] = None,
+) -> typing.Tuple[typing.Tuple[str, ...], typing.List[typing.List[typing.Any]]]:
+    """Split rows into their column names and a list of values of every column."""
+    names = tuple(columns or rows[0].keys())
+    return names, [[row[name] for row in rows] for name in names]
+
+
+def _affected(status: str) -> int:
+    return int(status.rsplit(" ", 1)[-1])
+
+
+COLUMN_TYPES_EXPRESSION = """
+SELECT attname, format_type(atttypid, atttypmod) AS type FROM pg_attribute
+WHERE attrelid = $1::regclass AND attnum > 0 AND NOT attisdropped
+"""
+
+
 class Connection:
+    """Database connection backed by one or more connection pools.
+
+    Every pooled connection keeps up to `statement_cache_size` prepared statements keyed by their
+    text, so the memoized statements of the helpers are only prepared once per connection.
+
+    Besides the default pool, named pools given through `pools` keep their connections
+    reserved for one kind of work, `using()` gets a view of the connection using one of them.
+
+    With a `replica` dsn, reads of the read-only helpers go to a pool of the replica. A task
+    which wrote in the last `read_your_writes` seconds keeps reading from the primary, as do
+    transactions and the `primary` view.
+    """
+
     pool: asyncpg.Pool[asyncpg.Record]
-    schema: pathlib.Path
+    pools: typing.Mapping[str, asyncpg.Pool[asyncpg.Record]]
+    replica: typing.Optional[asyncpg.Pool[asyncpg.Record]]
+    read_your_writes: float
+    migrations: pathlib.Path
+    metrics: QueryMetrics
+    explainer: typing.Optional[QueryExplainer]
 
     def __init__(
         self,
@@ -61,43 +227,268 @@ class Connection:
         max_size: int = 10,
         max_queries: int = 50000,
         max_inactive_connection_lifetime: float = 300.0,
-        schema: typing.Optional[typing.Union[os.PathLike[str], str]] = None,
+        migrations: typing.Optional[typing.Union[os.PathLike[str], str]] = None,
+        init: typing.Optional[typing.Callable[[asyncpg.Connection[asyncpg.Record]], typing.Awaitable[None]]] = None,
+        pools: typing.Optional[typing.Mapping[str, typing.Mapping[str, typing.Any]]] = None,
+        explainer: typing.Optional[QueryExplainer] = None,
+        replica: typing.Optional[str] = None,
+        read_your_writes: float = 5.0,
+        statement_cache_size: int = 256,
         **connect_kwargs: typing.Any,
     ) -> None:
-        self.pool = asyncpg.create_pool(
-            dsn,
+        self.metrics = QueryMetrics()
+        self.explainer = explainer
+        self._init = init
+        self._connect = functools.partial(asyncpg.connect, dsn, **connect_kwargs)
+
+        options: typing.Dict[str, typing.Any] = dict(
             min_size=min_size,
             max_size=max_size,
             max_queries=max_queries,
             max_inactive_connection_lifetime=max_inactive_connection_lifetime,
+            init=self._init_connection,
+            statement_cache_size=statement_cache_size,
             **connect_kwargs,
         )
-
-        if schema is not None:
-            self.schema = pathlib.Path(schema)
-        else:
-            self.schema = pathlib.Path(__file__).parent / "schema.sql"
+        self.pool = self._create_pool(dsn, **options)
+        self.pools = {"default": self.pool}
+        for name, overrides in (pools or {}).items():
+            self.pools[name] = self._create_pool(dsn, **{**options, **overrides})
+
+        self.replica = None
+        if replica is not None:
+            self.replica = self.pools["replica"] = self._create_pool(replica, **options)
+        self.read_your_writes = read_your_writes
+
+        self.migrations = pathlib.Path(migrations) if migrations is not None else migrate.MIGRATIONS
+
+        self._column_types: typing.Dict[str, typing.Mapping[str, str]] = {}
+        self._caches: typing.Dict[str, TableCache] = {}
+        self._buses: typing.Dict[str, InvalidationBus] = {}
+        self._explaining: typing.Set[asyncio.Task[None]] = set()
+        self._views: typing.Dict[str, Connection] = {"default": self}
+        self._held: typing.Optional[asyncpg.Connection[asyncpg.Record]] = None
+        self._primary = False
+        self._deferred: typing.Optional[
+            typing.List[typing.Tuple[typing.Union[str, type], typing.Sequence[typing.Mapping[str, typing.Any]]]]
+        ] = None
+
+    def _create_pool(self, dsn: str, **options: typing.Any) -> asyncpg.Pool[asyncpg.Record]:
+        return asyncpg.create_pool(dsn, **options)
+
+    async def _init_connection(self, con: asyncpg.Connection[asyncpg.Record]) -> None:
+        con.add_query_logger(self._log_query)
+
+        if self._init is not None:
+            await self._init(con)
+
+    def _log_query(self, record: asyncpg.connection.LoggedQuery) -> None:
+        self.metrics.log_query(record)
+
+        if self.explainer is not None and self.explainer.should_explain(record):
+            task = asyncio.create_task(self._explain(record))
+            self._explaining.add(task)
+            task.add_done_callback(self._explaining.discard)
+
+    async def _explain(self, record: asyncpg.connection.LoggedQuery) -> None:
+        assert self.explainer is not None
+
+        # plans are captured off of the pool used by commands when there's one
+        connection = self.using("background") if "background" in self.pools else self
+        try:
+            async with connection.acquire() as con:
+                await self.explainer.explain(con, record)
+        finally:
+            # the claim is released even if no connection could be acquired or this got cancelled
+            self.explainer.release()
 
     @property
     def initialized(self) -> bool:
-        return self.pool._initialized  # type: ignore
+        return all(pool._initialized for pool in self.pools.values())  # type: ignore
+
+    def using(self, name: str) -> Connection:
+        """Get a view of this connection which uses a different pool.
+
+        Views share everything else, including metrics and caches.
+        """
+        if (view := self._views.get(name)) is not None:
+            return view
+
+        if name not in self.pools:
+            raise KeyError(f"No pool named {name}")
+
+        view = copy.copy(self)
+        view.pool = self.pools[name]
+        self._views[name] = view
+        return view
+
+    @property
+    def primary(self) -> Connection:
+        """Get a view of this connection which never reads from the replica."""
+        if self.replica is None or self._primary:
+            return self
 
-    async def create_tables(self) -> None:
-        command = self.schema.read_text()
-        await self.execute(command)
+        view = copy.copy(self)
+        view._primary = True
+        return view
+
+    async def migrate(self) -> typing.Sequence[migrate.Migration]:
+        """Apply all pending migrations and return them."""
+        async with self.acquire() as con:
+            return await migrate.apply_migrations(con, migrate.load_migrations(self.migrations))
 
     async def intialize(self) -> None:
-        if self.pool._initializing or self.pool._initialized:  # type: ignore
-            return
+        for pool in self.pools.values():
+            if pool._initializing or pool._initialized:  # type: ignore
+                continue
 
-        await self.pool._async__init__()  # type: ignore
+            await pool._async__init__()  # type: ignore
 
     async def connect(self) -> None:
         await self.intialize()
-        await self.create_tables()
+        await self.migrate()
 
     async def close(self, *exc: typing.Any) -> None:
-        await self.pool.close()
+        for task in self._explaining:
+            task.cancel()
+
+        for bus in set(self._buses.values()):
+            await bus.close()
+
+        for pool in self.pools.values():
+            await pool.close()
+
+    def pool_metrics(self) -> PoolMetrics:
+        return PoolMetrics(self.pool.get_size(), self.pool.get_idle_size(), self.pool.get_max_size())
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, *, read: bool = False) -> typing.AsyncIterator[asyncpg.Connection[asyncpg.Record]]:
+        """Acquire a connection from the pool, recording how long it took.
+
+        Connections for reads come from the replica if they can be served by it.
+        """
+        if self._held is not None:
+            yield self._held
+            return
+
+        pool = self.replica if read and self._reads_replica() else self.pool
+        assert pool is not None
+
+        start = time.perf_counter()
+        async with pool.acquire() as con:
+            self.metrics.acquire.observe(time.perf_counter() - start)
+            yield con
+
+    def _reads_replica(self, table: typing.Optional[str] = None) -> bool:
+        if self.replica is None or self._primary:
+            return False
+
+        since = time.monotonic() - self.read_your_writes
+        if _last_write.get() > since:
+            return False
+
+        # rows invalidated by other processes might not have reached the replica yet
+        cache = self._caches.get(table) if table is not None else None
+        return cache is None or cache.invalidated <= since
+
+    def _wrote(self) -> None:
+        if self.replica is not None:
+            _last_write.set(time.monotonic())
+
+    @contextlib.asynccontextmanager
+    async def transaction(self, **kwargs: typing.Any) -> typing.AsyncIterator[Connection]:
+        """Run everything inside of the context manager in a single transaction.
+
+        Yields a view of this connection which holds onto one pooled connection,
+        so any amount of statements only costs a single checkout.
+        """
+        if self._held is not None:
+            async with self._held.transaction(**kwargs):
+                yield self
+            return
+
+        view = copy.copy(self)
+        view._deferred = []
+        try:
+            async with self.acquire() as con, con.transaction(**kwargs):
+                view._held = con
+                yield view
+        finally:
+            # rows cached by others while the transaction was open could still be the old ones
+            for table, rows in view._deferred:
+                self._invalidate(table, *rows)
+
+    @contextlib.asynccontextmanager
+    async def batch(self, **kwargs: typing.Any) -> typing.AsyncIterator[Batch]:
+        """Queue statements and send them together in a single transaction once the context manager exits."""
+        batch = Batch()
+        yield batch
+
+        self._wrote()
+        async with self.transaction(**kwargs) as con, con.acquire() as raw:
+            await batch.send(raw)
+
+    # caching
+
+    def cache(self, table: typing.Union[str, type], *, ttl: float = 60.0, max_size: int = 1024) -> TableCache:
+        """Cache rows selected from a table.
+
+        Writes made through this connection's helpers invalidate the rows they could affect,
+        or through `listen()` in every process. Anything else written to the table is only
+        picked up once the cached rows expire.
+        """
+        table = _tablename(table)
+        if (cache := self._caches.get(table)) is None:
+            cache = self._caches[table] = TableCache(ttl=ttl, max_size=max_size)
+
+        return cache
+
+    def _invalidate(self, table: typing.Union[str, type], *rows: typing.Mapping[str, typing.Any]) -> None:
+        if self._deferred is not None:
+            # invalidated again after the commit, in case the old rows got cached in the meantime
+            self._deferred.append((table, rows))
+
+        if (cache := self._caches.get(_tablename(table))) is not None:
+            cache.invalidate(*rows)
+
+    def _written(self, table: str) -> bool:
+        # rows written by an open transaction are only visible inside of it, so it can't use the cache for them
+        return self._deferred is not None and any(_tablename(written) == table for written, _ in self._deferred)
+
+    async def listen(self, *tables: typing.Union[str, type], channel: str = CHANNEL) -> InvalidationBus:
+        """Share invalidations of cached tables with other processes.
+
+        Writes to these tables made through the helpers are published to every process
+        listening on the same channel, which then invalidate the rows in their own caches.
+        """
+        names = [_tablename(table) for table in tables]
+        bus = InvalidationBus(self._connect, self._caches, names, channel=channel)
+        await bus.start()
+
+        for name in names:
+            self._buses[name] = bus
+
+        return bus
+
+    async def _write(
+        self,
+        table: typing.Union[str, type],
+        rows: typing.Sequence[typing.Mapping[str, typing.Any]],
+        method: str,
+        *args: typing.Any,
+        **kwargs: typing.Any,
+    ) -> str:
+        """Write with a method of a pooled connection, in a transaction with its notification if the table is shared."""
+        self._wrote()
+        if (bus := self._buses.get(_tablename(table))) is None:
+            async with self.acquire() as con:
+                return await getattr(con, method)(*args, **kwargs)
+
+        async with self.transaction() as view, view.acquire() as con:
+            status = await getattr(con, method)(*args, **kwargs)
+            await bus.publish(con, _tablename(table), *rows)
+
+        return status
 
     # commands
 
@@ -105,15 +496,44 @@ class Connection:
         if not issubclass(cls, asyncpg.Record):
             cls = make_record(cls)
 
-        async with self.pool.acquire() as con:
-            return await con.fetchrow(query, *args, record_class=cls)
+        async with self.acquire(read=True) as con:
+            row = await con.fetchrow(query, *args, record_class=cls)
+
+        self.metrics.add_rows(query, int(row is not None))
+        return row
 
     async def fetch(self, query: str, *args: typing.Any, cls: typing.Type[T] = asyncpg.Record) -> typing.Sequence[T]:
         if not issubclass(cls, asyncpg.Record):
             cls = make_record(cls)
 
-        async with self.pool.acquire() as con:
-            return await con.fetch(query, *args, record_class=cls)
+        async with self.acquire(read=True) as con:
+            rows = await con.fetch(query, *args, record_class=cls)
+
+        self.metrics.add_rows(query, len(rows))
+        return rows
+
+    async def iterate(
+        self,
+        query: str,
+        *args: typing.Any,
+        cls: typing.Type[T] = asyncpg.Record,
+        chunk_size: int = 1000,
+    ) -> typing.AsyncGenerator[typing.Sequence[T], None]:
+        """Stream the rows of a query in chunks of at most `chunk_size` rows.
+
+        Rows are read through a server-side cursor, which holds onto a pooled connection
+        until the iterator is exhausted or closed.
+        """
+        if not issubclass(cls, asyncpg.Record):
+            cls = make_record(cls)
+
+        # cursors only live inside of a transaction
+        async with self.transaction() as view, view.acquire() as con:
+            cursor = await con.cursor(query, *args, record_class=cls)
+
+            while rows := await cursor.fetch(chunk_size):
+                self.metrics.add_rows(query, len(rows))
+                yield rows
 
     async def select(
         self,
@@ -121,11 +541,21 @@ class Connection:
         table: typing.Optional[str] = None,
         **kwargs: typing.Any,
     ) -> typing.Optional[T]:
-        table = table or getattr(cls, "__tablename__")
+        name: str = table or getattr(cls, "__tablename__")
+        query = _select_query(name, tuple(kwargs))
+
+        if (cache := self._caches.get(name)) is None or self._written(name):
+            return await self.fetchrow(query, *kwargs.values(), cls=cls)
 
-        where = " AND ".join(make_eq(**kwargs))
-        query = f"SELECT * FROM {table} WHERE {where}"
-        return await self.fetchrow(query, *kwargs.values(), cls=cls)
+        key = cache.make_key(cls, kwargs)
+        if (row := cache.get(key)) is not MISSING:
+            return row
+
+        version = cache.version
+        connection = self if self._reads_replica(name) else self.primary
+        row = await connection.fetchrow(query, *kwargs.values(), cls=cls)
+        cache.set(key, row, version)
+        return row
 
     async def select_row(
         self,
@@ -133,23 +563,20 @@ class Connection:
         table: typing.Optional[str] = None,
         **kwargs: typing.Any,
     ) -> typing.Sequence[T]:
-        table = table or getattr(cls, "__tablename__")
-
-        where = " AND ".join(make_eq(**kwargs))
-        query = f"SELECT * FROM {table} WHERE {where}"
+        query = _select_query(table or getattr(cls, "__tablename__"), tuple(kwargs))
         return await self.fetch(query, *kwargs.values(), cls=cls)
 
     async def execute(self, query: str, *args: typing.Any) -> str:
-        return await self.pool.execute(query, *args)
+        self._wrote()
+        async with self.acquire() as con:
+            return await con.execute(query, *args)
 
     async def insert(self, table: typing.Union[str, type], **kwargs: typing.Any) -> str:
-        table = table if isinstance(table, str) else getattr(table, "__tablename__")
-
-        columns = ", ".join(kwargs.keys())
-        values = ", ".join(make_s(**kwargs))
-        query = f"INSERT INTO {table} ({columns}) VALUES ({values})"
-
-        return await self.execute(query, *kwargs.values())
+        query = _insert_query(_tablename(table), tuple(kwargs))
+        try:
+            return await self._write(table, [kwargs], "execute", query, *kwargs.values())
+        finally:
+            self._invalidate(table, kwargs)
 
     async def update(
         self,
@@ -157,17 +584,15 @@ class Connection:
         where: typing.Union[str, typing.Mapping[str, typing.Any]],
         **kwargs: typing.Any,
     ) -> str:
-        table = table if isinstance(table, str) else getattr(table, "__tablename__")
-
-        values = ", ".join(make_eq(**kwargs))
-        if isinstance(where, str):
-            where_str = where
-        else:
-            where_str = " AND ".join(make_eq(**where, start=len(kwargs) + 1))
-
-        query = f"UPDATE {table} SET {values} WHERE {where_str}"
-
-        return await self.execute(query, *kwargs.values(), *(where.values() if not isinstance(where, str) else ()))
+        query = _update_query(_tablename(table), tuple(kwargs), where if isinstance(where, str) else tuple(where))
+        # both the rows before and after the update are affected, without known values it's the whole table
+        rows = [] if isinstance(where, str) else [where, {**where, **kwargs}]
+        try:
+            return await self._write(
+                table, rows, "execute", query, *kwargs.values(), *(where.values() if not isinstance(where, str) else ())
+            )
+        finally:
+            self._invalidate(table, *rows)
 
     async def upsert(
         self,
@@ -175,24 +600,104 @@ class Connection:
         keys: typing.Optional[typing.Sequence[str]] = None,
         **kwargs: typing.Any,
     ) -> str:
-        table = table if isinstance(table, str) else getattr(table, "__tablename__")
         keys = (keys,) if isinstance(keys, str) else (keys or tuple(kwargs.keys()))
 
-        columns = ", ".join(kwargs.keys())
-        values = ", ".join(make_s(**kwargs))
-        conflict_keys = ", ".join(keys)
-        conflict_values = ", ".join(make_eq(**kwargs))
-        query = (
-            f"INSERT INTO {table} ({columns}) VALUES ({values}) "
-            f"ON CONFLICT ({conflict_keys}) DO UPDATE SET {conflict_values}"
-        )
-
-        return await self.execute(query, *kwargs.values())
+        query = _upsert_query(_tablename(table), tuple(kwargs), tuple(keys))
+        rows = [{key: kwargs[key] for key in keys}]
+        try:
+            return await self._write(table, rows, "execute", query, *kwargs.values())
+        finally:
+            self._invalidate(table, *rows)
 
     async def delete(self, table: typing.Union[str, type], **kwargs: typing.Any) -> str:
-        table = table if isinstance(table, str) else getattr(table, "__tablename__")
+        query = _delete_query(_tablename(table), tuple(kwargs))
+        try:
+            return await self._write(table, [kwargs], "execute", query, *kwargs.values())
+        finally:
+            self._invalidate(table, kwargs)
+
+    # bulk commands
 
-        where = " AND ".join(make_eq(**kwargs))
+    async def column_types(self, table: typing.Union[str, type]) -> typing.Mapping[str, str]:
+        """Get the sql types of the columns of a table."""
+        table = _tablename(table)
+        if (types := self._column_types.get(table)) is None:
+            rows = await self.fetch(COLUMN_TYPES_EXPRESSION, table)
+            types = self._column_types[table] = {row["attname"]: row["type"] for row in rows}
 
-        query = f"DELETE FROM {table} WHERE {where}"
-        return await self.execute(query, *kwargs.values())
+        return types
+
+    async def insert_many(self, table: typing.Union[str, type], rows: typing.Sequence[typing.Any]) -> int:
+        """Insert models or mappings with a single COPY and return the amount of inserted rows."""
+        if not rows:
+            return 0
+
+        schema, _, name = _tablename(table).rpartition(".")
+        mappings = [_as_mapping(row) for row in rows]
+        columns = tuple(mappings[0].keys())
+
+        try:
+            status = await self._write(
+                table,
+                mappings,
+                "copy_records_to_table",
+                name,
+                schema_name=schema or None,
+                columns=columns,
+                records=[[row[column] for column in columns] for row in mappings],
+            )
+        finally:
+            self._invalidate(table, *mappings)
+
+        return _affected(status)
+
+    async def upsert_many(
+        self,
+        table: typing.Union[str, type],
+        rows: typing.Sequence[typing.Any],
+        keys: typing.Optional[typing.Sequence[str]] = None,
+        *,
+        increment: typing.Sequence[str] = (),
+    ) -> int:
+        """Upsert models or mappings in a single statement and return the amount of affected rows.
+
+        Conflicting rows have all columns which aren't keys replaced, except for the ones in `increment`
+        which are added to. Rows must not conflict with each other.
+        """
+        if not rows:
+            return 0
+
+        table = _tablename(table)
+        keys = (keys,) if isinstance(keys, str) else tuple(keys or ())
+        mappings = [_as_mapping(row) for row in rows]
+        columns, values = _columns(mappings)
+        keys = keys or columns
+
+        query = _upsert_many_query(table, columns, await self.column_types(table), keys, tuple(increment))
+        affected = [{key: row[key] for key in keys} for row in mappings]
+        try:
+            return _affected(await self._write(table, affected, "execute", query, *values))
+        finally:
+            self._invalidate(table, *affected)
+
+    async def delete_many(
+        self,
+        table: typing.Union[str, type],
+        rows: typing.Sequence[typing.Any],
+        keys: typing.Optional[typing.Sequence[str]] = None,
+    ) -> int:
+        """Delete all rows matching the keys of models or mappings and return the amount of deleted rows."""
+        if not rows:
+            return 0
+
+        table = _tablename(table)
+        keys = (keys,) if isinstance(keys, str) else keys
+        mappings = [_as_mapping(row) for row in rows]
+        columns, values = _columns(mappings, keys)
+
+        query = _delete_many_query(table, columns, await self.column_types(table))
+        affected = [{column: row[column] for column in columns} for row in mappings]
+        try:
+            return _affected(await self._write(table, affected, "execute", query, *values))
+        finally:
+            self._invalidate(table, *affected)
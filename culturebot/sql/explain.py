@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import logging
+import logging.handlers
+import os
+import random
+import re
+import time
+import typing
+
+import asyncpg
+
+from .metrics import normalize_query
+
+__all__ = ["QueryExplainer", "parameter_shape"]
+
+_LOGGER = logging.getLogger(__name__)
+
+# only plain reads are analyzed since analyzing runs the statement again
+_READ = re.compile(r"\s*(SELECT|WITH)\b", re.IGNORECASE)
+_WRITE = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|pg_notify|pg_advisory\w*|create_\w+)\b", re.IGNORECASE)
+# statements which can't or shouldn't be explained at all
+_SKIP = re.compile(
+    r"\s*(EXPLAIN|BEGIN|COMMIT|ROLLBACK|SAVEPOINT|RELEASE|DECLARE|FETCH|CLOSE|SET|SHOW)\b", re.IGNORECASE
+)
+
+
+def parameter_shape(value: typing.Any) -> str:
+    """Describe the type of a query parameter without its value."""
+    if isinstance(value, (list, tuple)):
+        items = sorted({parameter_shape(item) for item in typing.cast("typing.Sequence[typing.Any]", value)})
+        return f"{type(value).__name__}[{' | '.join(items)}]({len(value)})"
+
+    return type(value).__name__
+
+
+class QueryExplainer:
+    """Captures query plans of a sample of slow statements.
+
+    Statements which took longer than `threshold` seconds are explained on a separate connection
+    at most once every `cooldown` seconds, reads with EXPLAIN ANALYZE in a read-only transaction
+    which is rolled back and everything else with a plain EXPLAIN. Plans are logged together with
+    the types of the parameters, into a rotating file if a path is given.
+    """
+
+    threshold: float
+    sample_rate: float
+    cooldown: float
+    logger: logging.Logger
+
+    _explained: typing.Dict[str, float]
+    _running: bool
+
+    def __init__(
+        self,
+        threshold: float,
+        *,
+        sample_rate: float = 0.1,
+        cooldown: float = 300.0,
+        path: typing.Optional[typing.Union[str, os.PathLike[str]]] = None,
+        max_bytes: int = 10 * 1024 * 1024,
+        backup_count: int = 3,
+    ) -> None:
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.cooldown = cooldown
+        self.logger = logging.getLogger(f"{__name__}.plans")
+
+        if path is not None:
+            handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+            handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.INFO)
+            self.logger.propagate = False
+
+        self._explained = {}
+        self._running = False
+
+    def should_explain(self, record: asyncpg.connection.LoggedQuery) -> bool:
+        """Check whether a logged statement should be explained, claiming it if so."""
+        if record.elapsed < self.threshold or record.exception is not None or self._running:
+            return False
+
+        if _SKIP.match(record.query) or random.random() >= self.sample_rate:
+            return False
+
+        query = normalize_query(record.query)
+        now = time.monotonic()
+        if now - self._explained.get(query, -self.cooldown) < self.cooldown:
+            return False
+
+        self._explained[query] = now
+        self._running = True
+        return True
+
+    async def _plan(
+        self, con: asyncpg.Connection[asyncpg.Record], query: str, args: typing.Sequence[typing.Any]
+    ) -> str:
+        if _READ.match(query) and not _WRITE.search(query):
+            try:
+                async with con.transaction(readonly=True):
+                    rows = await con.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {query}", *args)
+                    # anything the statement did is thrown away
+                    raise _Rollback(rows)
+            except _Rollback as e:
+                rows = e.rows
+            except asyncpg.ReadOnlySQLTransactionError:
+                rows = await con.fetch(f"EXPLAIN {query}", *args)
+        else:
+            rows = await con.fetch(f"EXPLAIN {query}", *args)
+
+        return "\n".join(row[0] for row in rows)
+
+    def release(self) -> None:
+        """Release the claim of `should_explain`, allowing another statement to be explained."""
+        self._running = False
+
+    async def explain(
+        self,
+        con: asyncpg.Connection[asyncpg.Record],
+        record: asyncpg.connection.LoggedQuery,
+    ) -> None:
+        """Explain a claimed statement and log its plan."""
+        try:
+            plan = await self._plan(con, record.query, record.args or ())
+        except asyncpg.PostgresError as e:
+            _LOGGER.debug("Failed to explain %s: %s", normalize_query(record.query), e)
+            return
+        finally:
+            self.release()
+
+        self.logger.info(
+            "slow statement took %.1fms\nquery: %s\nparameters: (%s)\n%s\n",
+            record.elapsed * 1000,
+            normalize_query(record.query),
+            ", ".join(map(parameter_shape, record.args or ())),
+            plan,
+        )
+
+
+class _Rollback(Exception):
+    def __init__(self, rows: typing.Sequence[asyncpg.Record]) -> None:
+        self.rows = rows
@@ -0,0 +1,438 @@
+from __future__ import annotations
+
+import contextlib
+import copy
+import dataclasses
+import operator
+import time
+import typing
+
+import asyncpg
+
+from . import migrate
+from .batch import Batch
+from .connection import (
+    Connection,
+    _affected,
+    _as_mapping,
+    _delete_query,
+    _insert_query,
+    _select_query,
+    _tablename,
+    _update_query,
+    _upsert_query,
+)
+from .metrics import normalize_query
+from .notify import CHANNEL, InvalidationBus
+
+__all__ = ["MemoryConnection", "MemoryRecord", "MemoryTable"]
+
+T = typing.TypeVar("T")
+
+Row = typing.Dict[str, typing.Any]
+Result = typing.Union[str, typing.Sequence[typing.Mapping[str, typing.Any]]]
+Handler = typing.Callable[..., typing.Awaitable[Result]]
+
+
+class MemoryRecord(Row):
+    """Row returned by the memory backend, readable like an asyncpg record."""
+
+    def __getitem__(self, key: typing.Union[str, int]) -> typing.Any:
+        if isinstance(key, int):
+            return list(self.values())[key]
+
+        return super().__getitem__(key)
+
+    def __getattr__(self, key: str) -> typing.Any:
+        try:
+            return self[key]
+        except KeyError as e:
+            raise AttributeError(*e.args) from e
+
+
+_record_classes: typing.Dict[type, typing.Type[MemoryRecord]] = {}
+
+
+def make_memory_record(cls: typing.Type[T]) -> typing.Type[MemoryRecord]:
+    """Get the memory record class of a model, the counterpart of `make_record`."""
+    if (record := _record_classes.get(cls)) is not None:
+        return record
+
+    if dataclasses.is_dataclass(cls):
+        names = [field.name for field in dataclasses.fields(cls)]
+    else:
+        names = list(getattr(cls, "__annotations__", {}))
+
+    # dict comes before the model in the mro, so rows are constructed and compared like dicts
+    namespace = {name: property(operator.itemgetter(name)) for name in names}
+    record = _record_classes[cls] = type(cls.__name__, (MemoryRecord, cls), namespace)
+    return record
+
+
+@dataclasses.dataclass
+class MemoryTable:
+    """Rows of a single table keyed by their primary key."""
+
+    key: typing.Tuple[str, ...]
+    defaults: typing.Mapping[str, typing.Any] = dataclasses.field(default_factory=dict)
+    rows: typing.Dict[typing.Tuple[typing.Any, ...], Row] = dataclasses.field(default_factory=dict)
+
+    def primary(self, row: typing.Mapping[str, typing.Any]) -> typing.Tuple[typing.Any, ...]:
+        return tuple(row[column] for column in self.key)
+
+    def find(self, where: typing.Mapping[str, typing.Any]) -> typing.List[typing.Tuple[typing.Any, ...]]:
+        """Get the primary keys of all rows matching some values."""
+        if where.keys() == set(self.key):
+            primary = self.primary(where)
+            return [primary] if primary in self.rows else []
+
+        return [
+            primary
+            for primary, row in self.rows.items()
+            if all(row.get(column) == value for column, value in where.items())
+        ]
+
+
+# tables of the migrations with their primary or unique key and column defaults
+SCHEMA: typing.Mapping[str, typing.Tuple[typing.Tuple[str, ...], typing.Mapping[str, typing.Any]]] = {
+    "auth.oauth": (("key",), dict(refresh_token=None, scope=None, expires=None, token_type="Bearer")),
+    "auth.genshin": (
+        ("discord_id",),
+        dict(uid=None, hoyolab_id=None, cookies=None, authkey=None, lang=None, region=None),
+    ),
+    "swears.user": (("user_id", "guild_id"), dict(optout=False)),
+    "swears.swear": (("user_id", "guild_id", "swear"), dict(amount=0)),
+    "swears.total": (("guild_id", "user_id"), dict(amount=0)),
+    "swears.word": (("guild_id", "word"), {}),
+    "swears.backfill": (("channel_id",), dict(done=False)),
+    "swears.bucket": (("guild_id", "bucket", "user_id", "swear"), dict(amount=0)),
+}
+
+
+class _NullPool:
+    """Pool of a memory connection, it never has any connections."""
+
+    def __init__(self) -> None:
+        self._initializing = False
+        self._initialized = False
+
+    async def _async__init__(self) -> None:
+        self._initialized = True
+
+    async def close(self) -> None:
+        self._initialized = False
+
+    def get_size(self) -> int:
+        return 0
+
+    def get_idle_size(self) -> int:
+        return 0
+
+    def get_max_size(self) -> int:
+        return 0
+
+
+class _MemoryInvalidationBus(InvalidationBus):
+    # nothing else can write to the tables of this process, so there's nothing to listen for
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryConnection(Connection):
+    """Stand-in for a database connection which keeps every table in memory.
+
+    The helpers work on the tables of the migrations, raw statements only work once a handler
+    is registered for their exact text with `handle()`. Only meant for benchmarking everything
+    besides the database, nothing is ever persisted and statements without a handler raise
+    NotImplementedError, so it can't be configured as the database of the bot.
+    """
+
+    tables: typing.Dict[str, MemoryTable]
+    handlers: typing.Dict[str, Handler]
+
+    def __init__(self) -> None:
+        super().__init__("memory://")
+        self.tables = {name: MemoryTable(key, defaults) for name, (key, defaults) in SCHEMA.items()}
+        self.handlers = {}
+
+        self._journal: typing.Optional[typing.List[typing.Tuple[str, typing.Tuple[typing.Any, ...], typing.Any]]] = None
+
+    def _create_pool(self, dsn: str, **options: typing.Any) -> asyncpg.Pool[asyncpg.Record]:
+        return typing.cast("asyncpg.Pool[asyncpg.Record]", _NullPool())
+
+    def using(self, name: str) -> Connection:
+        return self
+
+    async def migrate(self) -> typing.Sequence[migrate.Migration]:
+        return []
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, *, read: bool = False) -> typing.AsyncIterator[asyncpg.Connection[asyncpg.Record]]:
+        # raw statements on the acquired connection go through the same handlers
+        yield typing.cast("asyncpg.Connection[asyncpg.Record]", self)
+
+    @contextlib.asynccontextmanager
+    async def transaction(self, **kwargs: typing.Any) -> typing.AsyncIterator[Connection]:
+        """Undo every write made inside of the context manager if it raises."""
+        view = self if self._journal is not None else copy.copy(self)
+        if view._journal is None:
+            view._journal = []
+
+        # writes of nested transactions stay in the journal so the outermost one can still undo them
+        savepoint = len(view._journal)
+        try:
+            yield view
+        except BaseException:
+            for name, primary, row in reversed(view._journal[savepoint:]):
+                self._put(name, primary, row, journal=False)
+
+            del view._journal[savepoint:]
+            raise
+
+    @contextlib.asynccontextmanager
+    async def batch(self, **kwargs: typing.Any) -> typing.AsyncIterator[Batch]:
+        batch = Batch()
+        yield batch
+
+        async with self.transaction(**kwargs) as con:
+            await batch.send(typing.cast("asyncpg.Connection[asyncpg.Record]", con))
+
+    async def listen(self, *tables: typing.Union[str, type], channel: str = CHANNEL) -> InvalidationBus:
+        bus = _MemoryInvalidationBus(self._connect, self._caches, map(_tablename, tables), channel=channel)
+        for table in bus.tables:
+            self._buses[table] = bus
+
+        return bus
+
+    # storage
+
+    def handle(self, query: str, callback: Handler) -> None:
+        """Handle a raw statement with a callback receiving this connection and the arguments.
+
+        The callback returns rows for fetches or a status for executions.
+        """
+        self.handlers[normalize_query(query)] = callback
+
+    def table(self, table: typing.Union[str, type]) -> MemoryTable:
+        name = _tablename(table)
+        if (memory := self.tables.get(name)) is None:
+            raise asyncpg.UndefinedTableError(f'relation "{name}" does not exist')
+
+        return memory
+
+    def _put(
+        self, name: str, primary: typing.Tuple[typing.Any, ...], row: typing.Optional[Row], journal: bool = True
+    ) -> None:
+        rows = self.tables[name].rows
+        if journal and self._journal is not None:
+            self._journal.append((name, primary, rows.get(primary)))
+
+        if row is None:
+            rows.pop(primary, None)
+        else:
+            rows[primary] = row
+
+    def _observe(self, query: str, start: float, rows: int = 0) -> None:
+        metrics = self.metrics.statement(query)
+        metrics.latency.observe(time.perf_counter() - start)
+        metrics.rows += rows
+
+    def _records(self, rows: typing.Iterable[typing.Mapping[str, typing.Any]], cls: type) -> typing.List[typing.Any]:
+        record = MemoryRecord if issubclass(cls, asyncpg.Record) else make_memory_record(cls)
+        return [record(row) for row in rows]
+
+    async def _run(self, query: str, *args: typing.Any) -> Result:
+        normalized = normalize_query(query)
+        if (callback := self.handlers.get(normalized)) is None:
+            raise NotImplementedError(f"No memory handler for statement: {normalized}")
+
+        start = time.perf_counter()
+        try:
+            return await callback(self, *args)
+        except Exception:
+            self.metrics.statement(query).errors += 1
+            raise
+        finally:
+            self.metrics.statement(query).latency.observe(time.perf_counter() - start)
+
+    def _insert(self, name: str, values: typing.Mapping[str, typing.Any]) -> None:
+        table = self.table(name)
+        row = {**table.defaults, **values}
+        if (primary := table.primary(row)) in table.rows:
+            raise asyncpg.UniqueViolationError(f"duplicate key value violates unique constraint of {name}")
+
+        self._put(name, primary, row)
+
+    def _upsert(
+        self,
+        name: str,
+        values: typing.Mapping[str, typing.Any],
+        keys: typing.Sequence[str],
+        increment: typing.Collection[str] = (),
+    ) -> None:
+        table = self.table(name)
+        if not (found := table.find({key: values[key] for key in keys})):
+            row = {**table.defaults, **values}
+            self._put(name, table.primary(row), row)
+            return
+
+        old = table.rows[found[0]]
+        row = {**old, **values}
+        for column in increment:
+            row[column] = old[column] + values[column]
+
+        self._put(name, found[0], None)
+        self._put(name, table.primary(row), row)
+
+    # commands
+
+    async def fetchrow(self, query: str, *args: typing.Any, cls: typing.Type[T] = asyncpg.Record) -> typing.Optional[T]:
+        rows = await self.fetch(query, *args, cls=cls)
+        return rows[0] if rows else None
+
+    async def fetch(self, query: str, *args: typing.Any, cls: typing.Type[T] = asyncpg.Record) -> typing.Sequence[T]:
+        result = await self._run(query, *args)
+        rows = [] if isinstance(result, str) else self._records(result, cls)
+        self.metrics.add_rows(query, len(rows))
+        return rows
+
+    async def executemany(self, query: str, args: typing.Iterable[typing.Sequence[typing.Any]]) -> None:
+        for arguments in args:
+            await self._run(query, *arguments)
+
+    async def iterate(
+        self,
+        query: str,
+        *args: typing.Any,
+        cls: typing.Type[T] = asyncpg.Record,
+        chunk_size: int = 1000,
+    ) -> typing.AsyncGenerator[typing.Sequence[T], None]:
+        rows = await self.fetch(query, *args, cls=cls)
+        for index in range(0, len(rows), chunk_size):
+            yield rows[index : index + chunk_size]
+
+    async def select(
+        self,
+        cls: typing.Type[T] = asyncpg.Record,
+        table: typing.Optional[str] = None,
+        **kwargs: typing.Any,
+    ) -> typing.Optional[T]:
+        rows = await self.select_row(cls, table, **kwargs)
+        return rows[0] if rows else None
+
+    async def select_row(
+        self,
+        cls: typing.Type[T] = asyncpg.Record,
+        table: typing.Optional[str] = None,
+        **kwargs: typing.Any,
+    ) -> typing.Sequence[T]:
+        name = table or getattr(cls, "__tablename__")
+        start = time.perf_counter()
+
+        memory = self.table(name)
+        rows = self._records([memory.rows[primary] for primary in memory.find(kwargs)], cls)
+
+        self._observe(_select_query(name, tuple(kwargs)), start, len(rows))
+        return rows
+
+    async def execute(self, query: str, *args: typing.Any) -> str:
+        result = await self._run(query, *args)
+        return result if isinstance(result, str) else f"SELECT {len(result)}"
+
+    async def insert(self, table: typing.Union[str, type], **kwargs: typing.Any) -> str:
+        start = time.perf_counter()
+        self._insert(_tablename(table), kwargs)
+
+        self._observe(_insert_query(_tablename(table), tuple(kwargs)), start)
+        return "INSERT 0 1"
+
+    async def update(
+        self,
+        table: typing.Union[str, type],
+        where: typing.Union[str, typing.Mapping[str, typing.Any]],
+        **kwargs: typing.Any,
+    ) -> str:
+        if isinstance(where, str):
+            raise NotImplementedError("Memory connections can only update rows matching values")
+
+        name = _tablename(table)
+        start = time.perf_counter()
+
+        memory = self.table(name)
+        found = memory.find(where)
+        for primary in found:
+            row = {**memory.rows[primary], **kwargs}
+            self._put(name, primary, None)
+            self._put(name, memory.primary(row), row)
+
+        self._observe(_update_query(name, tuple(kwargs), tuple(where)), start)
+        return f"UPDATE {len(found)}"
+
+    async def upsert(
+        self,
+        table: typing.Union[str, type],
+        keys: typing.Optional[typing.Sequence[str]] = None,
+        **kwargs: typing.Any,
+    ) -> str:
+        keys = (keys,) if isinstance(keys, str) else (keys or tuple(kwargs.keys()))
+        start = time.perf_counter()
+        self._upsert(_tablename(table), kwargs, keys)
+
+        self._observe(_upsert_query(_tablename(table), tuple(kwargs), tuple(keys)), start)
+        return "INSERT 0 1"
+
+    async def delete(self, table: typing.Union[str, type], **kwargs: typing.Any) -> str:
+        name = _tablename(table)
+        start = time.perf_counter()
+
+        found = self.table(name).find(kwargs)
+        for primary in found:
+            self._put(name, primary, None)
+
+        self._observe(_delete_query(name, tuple(kwargs)), start)
+        return f"DELETE {len(found)}"
+
+    # bulk commands
+
+    async def column_types(self, table: typing.Union[str, type]) -> typing.Mapping[str, str]:
+        raise NotImplementedError("Memory tables aren't typed")
+
+    async def insert_many(self, table: typing.Union[str, type], rows: typing.Sequence[typing.Any]) -> int:
+        async with self.transaction() as con:
+            for row in rows:
+                typing.cast(MemoryConnection, con)._insert(_tablename(table), _as_mapping(row))
+
+        return len(rows)
+
+    async def upsert_many(
+        self,
+        table: typing.Union[str, type],
+        rows: typing.Sequence[typing.Any],
+        keys: typing.Optional[typing.Sequence[str]] = None,
+        *,
+        increment: typing.Sequence[str] = (),
+    ) -> int:
+        keys = (keys,) if isinstance(keys, str) else tuple(keys or ())
+
+        async with self.transaction() as con:
+            for row in map(_as_mapping, rows):
+                typing.cast(MemoryConnection, con)._upsert(_tablename(table), row, keys or tuple(row), increment)
+
+        return len(rows)
+
+    async def delete_many(
+        self,
+        table: typing.Union[str, type],
+        rows: typing.Sequence[typing.Any],
+        keys: typing.Optional[typing.Sequence[str]] = None,
+    ) -> int:
+        keys = (keys,) if isinstance(keys, str) else keys
+        deleted = 0
+        for row in map(_as_mapping, rows):
+            deleted += _affected(await self.delete(table, **{key: row[key] for key in keys or row}))
+
+        return deleted
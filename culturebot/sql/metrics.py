@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import bisect
+import collections
+import dataclasses
+import functools
+import typing
+
+import asyncpg
+
+__all__ = ["Histogram", "PoolMetrics", "QueryMetrics", "StatementMetrics", "normalize_query"]
+
+# upper bounds of histogram buckets in seconds, the last bucket is unbounded
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_query(query: str) -> str:
+    """Collapse the whitespace of a query so formatting doesn't split its metrics."""
+    return " ".join(query.split())
+
+
+@dataclasses.dataclass
+class Histogram:
+    """Latency histogram with fixed buckets."""
+
+    counts: typing.List[int] = dataclasses.field(default_factory=lambda: [0] * (len(BUCKETS) + 1))
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def average(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: Histogram) -> None:
+        """Add the observations of another histogram to this one."""
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float:
+        """Get the upper bound of the bucket a quantile falls in."""
+        if not self.count:
+            return 0.0
+
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+
+        return self.max
+
+    def export(self) -> typing.Mapping[str, typing.Any]:
+        return dict(
+            buckets=dict(zip(map(str, BUCKETS + (float("inf"),)), self.counts)),
+            count=self.count,
+            total=self.total,
+            max=self.max,
+        )
+
+
+@dataclasses.dataclass
+class StatementMetrics:
+    """Metrics of a single normalized statement."""
+
+    latency: Histogram = dataclasses.field(default_factory=Histogram)
+    errors: int = 0
+    rows: int = 0
+
+    def merge(self, other: StatementMetrics) -> None:
+        self.latency.merge(other.latency)
+        self.errors += other.errors
+        self.rows += other.rows
+
+    def export(self) -> typing.Mapping[str, typing.Any]:
+        return dict(latency=self.latency.export(), errors=self.errors, rows=self.rows)
+
+
+@dataclasses.dataclass
+class PoolMetrics:
+    size: int
+    idle: int
+    max_size: int
+
+    @property
+    def in_use(self) -> int:
+        return self.size - self.idle
+
+
+class QueryMetrics:
+    """In-process metrics of all queries and pool acquires of a connection.
+
+    Statement latencies come from a query logger installed on every pooled connection,
+    so statements ran directly on acquired connections are measured too. Returned rows
+    are only known for queries made through the `Connection` helpers.
+
+    At most `max_statements` statements are tracked on their own, the least recently
+    used ones are merged into `other` so dynamic SQL can't grow the metrics forever.
+    """
+
+    statements: collections.OrderedDict[str, StatementMetrics]
+    other: StatementMetrics
+    acquire: Histogram
+    max_statements: int
+
+    def __init__(self, *, max_statements: int = 1000) -> None:
+        self.statements = collections.OrderedDict()
+        self.other = StatementMetrics()
+        self.acquire = Histogram()
+        self.max_statements = max_statements
+
+    def statement(self, query: str) -> StatementMetrics:
+        query = normalize_query(query)
+        if (metrics := self.statements.get(query)) is not None:
+            self.statements.move_to_end(query)
+            return metrics
+
+        metrics = self.statements[query] = StatementMetrics()
+        while len(self.statements) > self.max_statements:
+            _, evicted = self.statements.popitem(last=False)
+            self.other.merge(evicted)
+
+        return metrics
+
+    def log_query(self, record: asyncpg.connection.LoggedQuery) -> None:
+        """Record an executed query, meant to be used as an asyncpg query logger."""
+        metrics = self.statement(record.query)
+        metrics.latency.observe(record.elapsed)
+        if record.exception is not None:
+            metrics.errors += 1
+
+    def add_rows(self, query: str, rows: int) -> None:
+        self.statement(query).rows += rows
+
+    @property
+    def errors(self) -> int:
+        return self.other.errors + sum(metrics.errors for metrics in self.statements.values())
+
+    def latency(self) -> Histogram:
+        """Get the latency histogram of all statements combined."""
+        histogram = Histogram()
+        histogram.merge(self.other.latency)
+        for metrics in self.statements.values():
+            histogram.merge(metrics.latency)
+
+        return histogram
+
+    def slowest(self, limit: int = 5) -> typing.Sequence[typing.Tuple[str, StatementMetrics]]:
+        """Get the statements with the most total time spent in them."""
+        return sorted(self.statements.items(), key=lambda item: item[1].latency.total, reverse=True)[:limit]
+
+    def export(self) -> typing.Mapping[str, typing.Any]:
+        """Export all metrics as json-compatible data."""
+        return dict(
+            acquire=self.acquire.export(),
+            statements={query: metrics.export() for query, metrics in self.statements.items()},
+            other=self.other.export(),
+        )
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import dataclasses
+import hashlib
+import logging
+import os
+import pathlib
+import re
+import typing
+
+import asyncpg
+
+__all__ = ["Migration", "MigrationError", "apply_migrations", "load_migrations"]
+
+_LOGGER = logging.getLogger(__name__)
+
+MIGRATIONS = pathlib.Path(__file__).parent / "migrations"
+# arbitrary key shared by every process migrating the same database
+LOCK_KEY = 0x63756C74757265
+
+MIGRATION_TABLE_EXPRESSION = """
+CREATE TABLE IF NOT EXISTS public.schema_migration
+(
+    version         INT NOT NULL,
+    name            CHARACTER VARYING NOT NULL,
+    checksum        CHARACTER VARYING NOT NULL,
+    applied         TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+
+    PRIMARY KEY (version)
+)
+"""
+APPLIED_EXPRESSION = "SELECT version, checksum FROM public.schema_migration"
+RECORD_EXPRESSION = "INSERT INTO public.schema_migration (version, name, checksum) VALUES ($1, $2, $3)"
+
+_FILENAME = re.compile(r"(\d+)_(\w+)\.sql")
+
+
+class MigrationError(Exception):
+    """The database schema doesn't match the migrations."""
+
+
+@dataclasses.dataclass
+class Migration:
+    version: int
+    name: str
+    sql: str
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.sql.encode()).hexdigest()
+
+
+def load_migrations(path: typing.Union[str, os.PathLike[str]] = MIGRATIONS) -> typing.Sequence[Migration]:
+    """Load all migrations named like `0001_name.sql` from a directory in order."""
+    migrations: typing.List[Migration] = []
+    for file in pathlib.Path(path).iterdir():
+        if match := _FILENAME.fullmatch(file.name):
+            migrations.append(Migration(int(match[1]), match[2], file.read_text()))
+
+    migrations.sort(key=lambda migration: migration.version)
+
+    versions = [migration.version for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise MigrationError(f"Duplicate migration versions in {path}")
+
+    return migrations
+
+
+def _pending(migrations: typing.Sequence[Migration], applied: typing.Mapping[int, str]) -> typing.Sequence[Migration]:
+    for migration in migrations:
+        checksum = applied.get(migration.version)
+        if checksum is not None and checksum != migration.checksum:
+            raise MigrationError(f"Migration {migration.version}_{migration.name} was changed after being applied")
+
+    return [migration for migration in migrations if migration.version not in applied]
+
+
+async def _applied(con: asyncpg.Connection[asyncpg.Record]) -> typing.Mapping[int, str]:
+    return {row["version"]: row["checksum"] for row in await con.fetch(APPLIED_EXPRESSION)}
+
+
+async def apply_migrations(
+    con: asyncpg.Connection[asyncpg.Record],
+    migrations: typing.Sequence[Migration],
+) -> typing.Sequence[Migration]:
+    """Apply all pending migrations and return them.
+
+    An up-to-date schema costs a single query, otherwise migrations are applied one transaction
+    each while holding an advisory lock so concurrently starting processes wait for each other.
+    """
+    try:
+        if not _pending(migrations, await _applied(con)):
+            return []
+    except asyncpg.UndefinedTableError:
+        pass
+
+    await con.execute("SELECT pg_advisory_lock($1)", LOCK_KEY)
+    try:
+        await con.execute(MIGRATION_TABLE_EXPRESSION)
+
+        # another process might've applied them while this one was waiting for the lock
+        pending = _pending(migrations, await _applied(con))
+        for migration in pending:
+            _LOGGER.info("Applying migration %s_%s", migration.version, migration.name)
+
+            async with con.transaction():
+                await con.execute(migration.sql)
+                await con.execute(RECORD_EXPRESSION, migration.version, migration.name, migration.checksum)
+
+        return pending
+    finally:
+        await con.execute("SELECT pg_advisory_unlock($1)", LOCK_KEY)
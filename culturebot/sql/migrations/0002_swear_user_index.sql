@@ -0,0 +1 @@
+CREATE INDEX IF NOT EXISTS user_guild_idx ON swears.user (guild_id);
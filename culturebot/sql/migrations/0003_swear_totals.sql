@@ -0,0 +1,22 @@
+CREATE INDEX IF NOT EXISTS swear_guild_user_idx ON swears.swear (guild_id, user_id, amount DESC);
+
+CREATE TABLE IF NOT EXISTS swears.total
+(
+    user_id         BIGINT NOT NULL,
+    guild_id        BIGINT NOT NULL,
+
+    amount          INT NOT NULL DEFAULT 0,
+
+    FOREIGN KEY (user_id, guild_id)
+        REFERENCES swears.user(user_id, guild_id),
+
+    PRIMARY KEY (guild_id, user_id)
+);
+
+CREATE INDEX IF NOT EXISTS total_guild_amount_idx ON swears.total (guild_id, amount DESC);
+
+-- fill the aggregate from existing counts, only ever does anything while it's empty
+INSERT INTO swears.total (user_id, guild_id, amount)
+SELECT user_id, guild_id, SUM(amount) FROM swears.swear
+WHERE NOT EXISTS (SELECT 1 FROM swears.total)
+GROUP BY user_id, guild_id;
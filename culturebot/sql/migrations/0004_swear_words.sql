@@ -0,0 +1,9 @@
+CREATE TABLE IF NOT EXISTS swears.word
+(
+    guild_id        BIGINT NOT NULL,
+
+    word            CHARACTER VARYING NOT NULL,
+    swear           CHARACTER VARYING NOT NULL,
+
+    PRIMARY KEY (guild_id, word)
+);
@@ -0,0 +1,10 @@
+CREATE TABLE IF NOT EXISTS swears.backfill
+(
+    channel_id      BIGINT NOT NULL,
+    guild_id        BIGINT NOT NULL,
+
+    message_id      BIGINT NOT NULL,
+    done            BOOLEAN NOT NULL DEFAULT FALSE,
+
+    PRIMARY KEY (channel_id)
+);
@@ -0,0 +1,27 @@
+CREATE TABLE IF NOT EXISTS swears.bucket
+(
+    user_id         BIGINT NOT NULL,
+    guild_id        BIGINT NOT NULL,
+
+    swear           CHARACTER VARYING NOT NULL,
+    bucket          TIMESTAMP WITH TIME ZONE NOT NULL,
+    amount          INT NOT NULL DEFAULT 0,
+
+    PRIMARY KEY (guild_id, bucket, user_id, swear)
+) PARTITION BY RANGE (bucket);
+
+CREATE INDEX IF NOT EXISTS bucket_guild_user_idx ON swears.bucket (guild_id, user_id, bucket);
+
+-- buckets are partitioned by month, partitions are created by the bot as they're needed
+CREATE OR REPLACE FUNCTION swears.create_bucket_partition(month DATE) RETURNS VOID AS $$
+DECLARE
+    since TIMESTAMP WITH TIME ZONE := date_trunc('month', month::TIMESTAMP) AT TIME ZONE 'UTC';
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS swears.%I PARTITION OF swears.bucket FOR VALUES FROM (%L) TO (%L)',
+        'bucket_' || to_char(since AT TIME ZONE 'UTC', 'YYYY_MM'),
+        since,
+        since + INTERVAL '1 month'
+    );
+END
+$$ LANGUAGE plpgsql;
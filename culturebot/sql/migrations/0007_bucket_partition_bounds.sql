@@ -0,0 +1,14 @@
+-- both bounds are computed in UTC, adding a month to a timestamptz follows the session's time zone
+-- which leaves gaps or overlaps between partitions on servers which aren't running in UTC
+CREATE OR REPLACE FUNCTION swears.create_bucket_partition(month DATE) RETURNS VOID AS $$
+DECLARE
+    start TIMESTAMP := date_trunc('month', month::TIMESTAMP);
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS swears.%I PARTITION OF swears.bucket FOR VALUES FROM (%L) TO (%L)',
+        'bucket_' || to_char(start, 'YYYY_MM'),
+        start AT TIME ZONE 'UTC',
+        (start + INTERVAL '1 month') AT TIME ZONE 'UTC'
+    );
+END
+$$ LANGUAGE plpgsql;
@@ -1,6 +1,6 @@
 import dataclasses
 
-__all__ = ["Swear", "SwearUser"]
+__all__ = ["BackfillCheckpoint", "Swear", "SwearTotal", "SwearUser", "SwearWord"]
 
 
 @dataclasses.dataclass
@@ -22,3 +22,34 @@ class SwearUser:
     guild_id: int
 
     optout: bool
+
+
+@dataclasses.dataclass
+class SwearTotal:
+    __tablename__ = "swears.total"
+
+    user_id: int
+    guild_id: int
+
+    amount: int
+
+
+@dataclasses.dataclass
+class SwearWord:
+    __tablename__ = "swears.word"
+
+    guild_id: int
+
+    word: str
+    swear: str
+
+
+@dataclasses.dataclass
+class BackfillCheckpoint:
+    __tablename__ = "swears.backfill"
+
+    channel_id: int
+    guild_id: int
+
+    message_id: int
+    done: bool
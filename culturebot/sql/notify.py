@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import typing
+import uuid
+
+import asyncpg
+
+from .cache import TableCache
+
+__all__ = ["InvalidationBus"]
+
+_LOGGER = logging.getLogger(__name__)
+
+CHANNEL = "culturebot_invalidate"
+# postgres rejects payloads of 8000 bytes or more
+MAX_PAYLOAD = 7900
+
+JSON_TYPES = (str, int, float, bool, type(None))
+
+
+def _encode(origin: str, table: str, rows: typing.Sequence[typing.Mapping[str, typing.Any]]) -> str:
+    # values which wouldn't compare equal after a round trip through json are left out,
+    # which only makes the invalidation broader
+    encoded = [{k: v for k, v in row.items() if isinstance(v, JSON_TYPES)} for row in rows]
+    payload = json.dumps(dict(origin=origin, table=table, rows=encoded or None))
+    if len(payload.encode()) >= MAX_PAYLOAD:
+        payload = json.dumps(dict(origin=origin, table=table, rows=None))
+
+    return payload
+
+
+class InvalidationBus:
+    """Invalidates cached rows across processes with postgres notifications.
+
+    Writes to the watched tables are published with NOTIFY, which postgres only delivers
+    once the writing transaction commits. Every process keeps a single dedicated connection
+    listening for them and invalidates its own caches. If that connection is lost, all
+    watched caches are cleared since notifications might've been missed.
+    """
+
+    tables: typing.FrozenSet[str]
+    channel: str
+    origin: str
+    reconnect_delay: float
+
+    _caches: typing.Mapping[str, TableCache]
+    _con: typing.Optional[asyncpg.Connection[asyncpg.Record]]
+    _task: typing.Optional[asyncio.Task[None]]
+
+    def __init__(
+        self,
+        connect: typing.Callable[[], typing.Awaitable[asyncpg.Connection[asyncpg.Record]]],
+        caches: typing.Mapping[str, TableCache],
+        tables: typing.Iterable[str],
+        *,
+        channel: str = CHANNEL,
+        reconnect_delay: float = 5.0,
+    ) -> None:
+        self.tables = frozenset(tables)
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self.reconnect_delay = reconnect_delay
+
+        self._connect = connect
+        self._caches = caches
+        self._con = None
+        self._task = None
+
+    async def publish(
+        self, con: asyncpg.Connection[asyncpg.Record], table: str, *rows: typing.Mapping[str, typing.Any]
+    ) -> None:
+        """Notify other processes of a write, inside of the writing transaction if there is one."""
+        await con.execute("SELECT pg_notify($1, $2)", self.channel, _encode(self.origin, table, rows))
+
+    def _clear(self) -> None:
+        for table in self.tables:
+            if (cache := self._caches.get(table)) is not None:
+                cache.invalidate()
+
+    def _on_notification(self, con: typing.Any, pid: int, channel: str, payload: str) -> None:
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            _LOGGER.warning("Received a malformed invalidation: %s", payload)
+            return
+
+        if data["origin"] == self.origin:
+            return
+
+        if (cache := self._caches.get(data["table"])) is not None:
+            cache.invalidate(*(data["rows"] or ()))
+
+    def _on_termination(self, con: typing.Any) -> None:
+        self._con = None
+        self._clear()
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._reconnect())
+
+    async def _listen(self) -> None:
+        con = await self._connect()
+        await con.add_listener(self.channel, self._on_notification)
+        con.add_termination_listener(self._on_termination)
+        self._con = con
+
+    async def _reconnect(self) -> None:
+        while self._con is None:
+            try:
+                await self._listen()
+            except (OSError, asyncpg.PostgresError):
+                _LOGGER.exception("Failed to reconnect the invalidation listener")
+                await asyncio.sleep(self.reconnect_delay)
+            else:
+                # anything written while disconnected has to be reloaded
+                self._clear()
+
+    async def start(self) -> None:
+        """Start listening for invalidations."""
+        if self._con is None:
+            await self._listen()
+
+    async def close(self) -> None:
+        """Stop listening for invalidations."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        if (con := self._con) is not None:
+            self._con = None
+            con.remove_termination_listener(self._on_termination)
+            await con.close()
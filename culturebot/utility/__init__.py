@@ -2,4 +2,5 @@ from .dependencies import *
 from .files import *
 from .formatting import *
 from .fuzz import *
+from .pipeline import *
 from .pretty import *
@@ -0,0 +1,130 @@
+import asyncio
+import dataclasses
+import logging
+import time
+import typing
+
+__all__ = ["Pipeline", "PipelineStats"]
+
+_LOGGER = logging.getLogger(__name__)
+
+T = typing.TypeVar("T")
+
+
+@dataclasses.dataclass
+class PipelineStats:
+    """Counters of a pipeline."""
+
+    processed: int = 0
+    failed: int = 0
+    dropped: int = 0
+
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+    @property
+    def average_latency(self) -> float:
+        """Average time between an item being submitted and processed in seconds."""
+        return self.total_latency / (self.processed + self.failed) if self.processed + self.failed else 0.0
+
+
+class Pipeline(typing.Generic[T]):
+    """Bounded queue of items processed by a fixed amount of workers.
+
+    Once `max_size` items are waiting new items are dropped, so a flood of items
+    can never start more than `workers` callbacks at once.
+
+    With a `key`, every worker gets its own queue and items with the same key always
+    go to the same worker, so they're processed one after another in order.
+    """
+
+    callback: typing.Callable[[T], typing.Awaitable[typing.Any]]
+    workers: int
+    key: typing.Optional[typing.Callable[[T], int]]
+    stats: PipelineStats
+
+    _queues: typing.List["asyncio.Queue[typing.Tuple[float, T]]"]
+    _tasks: typing.List[asyncio.Task[None]]
+
+    def __init__(
+        self,
+        callback: typing.Callable[[T], typing.Awaitable[typing.Any]],
+        *,
+        workers: int = 4,
+        max_size: int = 1000,
+        key: typing.Optional[typing.Callable[[T], int]] = None,
+    ) -> None:
+        self.callback = callback
+        self.workers = workers
+        self.key = key
+        self.stats = PipelineStats()
+
+        if key is None:
+            self._queues = [asyncio.Queue(max_size)]
+        else:
+            self._queues = [asyncio.Queue(max(1, max_size // workers)) for _ in range(workers)]
+        self._tasks = []
+
+    @property
+    def depth(self) -> int:
+        """Amount of items waiting to be processed."""
+        return sum(queue.qsize() for queue in self._queues)
+
+    @property
+    def max_size(self) -> int:
+        return sum(queue.maxsize for queue in self._queues)
+
+    def _queue(self, item: T) -> "asyncio.Queue[typing.Tuple[float, T]]":
+        if self.key is None:
+            return self._queues[0]
+
+        return self._queues[self.key(item) % len(self._queues)]
+
+    def submit(self, item: T) -> bool:
+        """Submit an item without waiting, returns False if it had to be dropped."""
+        try:
+            self._queue(item).put_nowait((time.perf_counter(), item))
+        except asyncio.QueueFull:
+            self.stats.dropped += 1
+            return False
+
+        return True
+
+    async def put(self, item: T) -> None:
+        """Submit an item, waiting until there's space for it."""
+        await self._queue(item).put((time.perf_counter(), item))
+
+    async def _work(self, queue: "asyncio.Queue[typing.Tuple[float, T]]") -> None:
+        while True:
+            submitted, item = await queue.get()
+
+            try:
+                await self.callback(item)
+            except Exception:
+                self.stats.failed += 1
+                _LOGGER.exception("Failed to process %r", item)
+            else:
+                self.stats.processed += 1
+            finally:
+                latency = time.perf_counter() - submitted
+                self.stats.total_latency += latency
+                self.stats.max_latency = max(self.stats.max_latency, latency)
+
+                queue.task_done()
+
+    def start(self) -> None:
+        """Start the workers."""
+        while len(self._tasks) < self.workers:
+            queue = self._queues[len(self._tasks) % len(self._queues)]
+            self._tasks.append(asyncio.create_task(self._work(queue)))
+
+    async def close(self) -> None:
+        """Process all waiting items and stop the workers."""
+        if self._tasks:
+            for queue in self._queues:
+                await queue.join()
+
+        for task in self._tasks:
+            task.cancel()
+
+        self._tasks.clear()
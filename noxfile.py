@@ -8,7 +8,7 @@ import nox
 nox.options.sessions = ["reformat", "type-check"]
 nox.options.reuse_existing_virtualenvs = True
 PACKAGE = "culturebot"
-GENERAL_TARGETS = ["./noxfile.py", "./culturebot", "./ext", "./web"]
+GENERAL_TARGETS = ["./noxfile.py", "./benchmarks", "./culturebot", "./ext", "./web"]
 
 nox_logger = logging.getLogger(nox.__name__)
 
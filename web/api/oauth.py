@@ -48,30 +48,32 @@ async def callback(
 
     me = await token.get_me()
 
-    if oauth := await connection.select(sql.models.OAuth, service=service, user_id=me["id"]):
-        await connection.update(
-            "auth.oauth",
-            dict(service=service, user_id=me["id"]),
-            access_token=token.access_token,
-            refresh_token=token.refresh_token,
-            scope=token.scope,
-            expires=token.expires,
-            token_type=token.token_type,
-        )
-        key = oauth.key
-    else:
-        key = secrets.token_urlsafe(32)
-        await connection.insert(
-            "auth.oauth",
-            service=service,
-            key=key,
-            access_token=token.access_token,
-            refresh_token=token.refresh_token,
-            scope=token.scope,
-            expires=token.expires,
-            token_type=token.token_type,
-            user_id=me["id"],
-        )
+    # the lookup and the write share one pooled connection
+    async with connection.transaction() as con:
+        if oauth := await con.select(sql.models.OAuth, service=service, user_id=me["id"]):
+            await con.update(
+                "auth.oauth",
+                dict(service=service, user_id=me["id"]),
+                access_token=token.access_token,
+                refresh_token=token.refresh_token,
+                scope=token.scope,
+                expires=token.expires,
+                token_type=token.token_type,
+            )
+            key = oauth.key
+        else:
+            key = secrets.token_urlsafe(32)
+            await con.insert(
+                "auth.oauth",
+                service=service,
+                key=key,
+                access_token=token.access_token,
+                refresh_token=token.refresh_token,
+                scope=token.scope,
+                expires=token.expires,
+                token_type=token.token_type,
+                user_id=me["id"],
+            )
 
     response = fastapi.responses.Response(json.dumps(dict(**me, token=dict(token)), default=str))
     response.set_cookie(f"{service}_key", key)
@@ -16,10 +16,20 @@ async def connection():
     global conn
 
     if conn is NotImplemented:
-        conn = culturebot.Connection(config.tokens.postgres)
+        conn = culturebot.Connection(
+            config.tokens.postgres,
+            min_size=config.database.min_size,
+            max_size=config.database.max_size,
+            replica=config.tokens.postgres_replica,
+            read_your_writes=config.database.read_your_writes,
+        )
+        # every request with cookies looks up its oauth tokens
+        conn.cache(culturebot.sql.models.OAuth, ttl=300)
 
     if not conn.initialized:
         await conn.connect()
+        # tokens can be written by the other workers of the web app
+        await conn.listen(culturebot.sql.models.OAuth)
 
     return conn
 